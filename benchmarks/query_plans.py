@@ -0,0 +1,106 @@
+"""
+Планы запросов лент до и после индексов из posts.0006_feed_indexes
+и posts.0011_post_created_index.
+
+    python benchmarks/query_plans.py [--posts 20000]
+"""
+import argparse
+import random
+
+from utils import setup_django, test_database
+
+BEFORE_MIGRATION = '0005_timelineentry'
+# Поля, которые есть и до BEFORE_MIGRATION.
+POST_FIELDS = ('text', 'created', 'author', 'group', 'image')
+
+
+def seed(posts_total):
+    from django.contrib.auth import get_user_model
+    from posts.models import Comment, Follow, Group, Post
+
+    random.seed(0)
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username='user%s' % number) for number in range(200)
+    )
+    users = list(User.objects.values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        Group(title='Группа %s' % number, slug='group-%s' % number,
+              description='')
+        for number in range(20)
+    )
+    groups = list(Group.objects.values_list('pk', flat=True))
+    Post.objects.bulk_create(
+        (
+            Post(text='Пост %s' % number, author_id=random.choice(users),
+                 group_id=random.choice(groups + [None]))
+            for number in range(posts_total)
+        ),
+        batch_size=500,
+    )
+    posts = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(text='Комментарий', post_id=random.choice(posts),
+                    author_id=random.choice(users))
+            for _ in range(posts_total)
+        ),
+        batch_size=500,
+    )
+    pairs = {tuple(random.sample(users, 2)) for _ in range(2000)}
+    Follow.objects.bulk_create(
+        Follow(user_id=user, author_id=author) for user, author in pairs
+    )
+
+
+def feed_queries():
+    from django.contrib.auth import get_user_model
+    from posts.models import Comment, Follow, Group, Post
+
+    user = get_user_model().objects.first()
+    author = get_user_model().objects.last()
+    group = Group.objects.first()
+    post = Post.objects.only('pk').first()
+    ordering = ('-created', '-id')
+    posts = Post.objects.only(*POST_FIELDS).order_by(*ordering)
+    return {
+        'index': posts,
+        'group_posts': posts.filter(group=group),
+        'profile': posts.filter(author=author),
+        'comments': Comment.objects.filter(post=post),
+        'profile_follow': Follow.objects.filter(
+            user=user, author=author,
+        ).only('user', 'author'),
+    }
+
+
+def plans():
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return {
+        name: queryset[:11].explain()
+        for name, queryset in feed_queries().items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=20000)
+    args = parser.parse_args()
+    setup_django()
+    from django.core.management import call_command
+
+    with test_database():
+        seed(args.posts)
+        after = plans()
+        call_command('migrate', 'posts', BEFORE_MIGRATION, verbosity=0)
+        before = plans()
+    for name in after:
+        print('== %s' % name)
+        print('-- до:\n%s' % before[name])
+        print('-- после:\n%s' % after[name])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Пропускная способность SQLite при одновременных чтении и записи.
+
+    python benchmarks/sqlite_concurrency.py [--readers 8] [--writers 2]
+                                            [--duration 5]
+
+Для каждого профиля создаётся отдельная временная база-файл с
+миграциями и данными. Потоки-читатели повторяют запросы ленты и
+страницы поста, потоки-писатели публикуют посты и комментарии; каждая
+операция обрамлена так же, как запрос Django (close_old_connections),
+поэтому CONN_MAX_AGE влияет на результат. Профили:
+
+- default — настройки Django по умолчанию: журнал DELETE, соединение
+  на каждый запрос;
+- tuned — SQLITE_PRAGMAS и CONN_MAX_AGE из settings.py.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from utils import setup_django
+
+USERS = 200
+POSTS = 5000
+BATCH_SIZE = 500
+
+
+def configure(path, pragmas, conn_max_age):
+    from django.conf import settings
+    from django.db import connections
+
+    connections.close_all()
+    settings.DATABASES['default'].update(NAME=path, CONN_MAX_AGE=conn_max_age)
+    settings.SQLITE_PRAGMAS = pragmas
+
+
+def prepare():
+    import io
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from posts.models import Post
+
+    call_command('migrate', stdout=io.StringIO())
+    User = get_user_model()
+    User.objects.bulk_create(
+        (User(username='user%s' % number) for number in range(USERS)),
+        batch_size=BATCH_SIZE,
+    )
+    users = list(User.objects.values_list('pk', flat=True))
+    Post.objects.bulk_create(
+        (
+            Post(text='Пост %s' % number, author_id=random.choice(users))
+            for number in range(POSTS)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    return users, list(Post.objects.values_list('pk', flat=True))
+
+
+def read(users, posts):
+    from posts.models import Post
+
+    list(Post.objects.for_feed()[:10])
+    list(Post.objects.for_detail().filter(pk=random.choice(posts)))
+
+
+def write(users, posts):
+    from posts.models import Comment, Post
+
+    if random.random() < 0.5:
+        Post.objects.create(text='Новый пост', author_id=random.choice(users))
+    else:
+        Comment.objects.create(
+            text='Комментарий', post_id=random.choice(posts),
+            author_id=random.choice(users),
+        )
+
+
+def worker(operation, data, deadline, stats):
+    from django.db import OperationalError, close_old_connections
+
+    while time.monotonic() < deadline:
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            operation(*data)
+        except OperationalError:
+            stats['errors'] += 1
+        else:
+            stats['timings'].append(time.perf_counter() - started)
+        finally:
+            close_old_connections()
+    # Соединения потока не переживают поток.
+    from django.db import connections
+    connections.close_all()
+
+
+def run(readers, writers, duration, data):
+    deadline = time.monotonic() + duration
+    stats = {
+        kind: {'timings': [], 'errors': 0} for kind in ('read', 'write')
+    }
+    threads = [
+        threading.Thread(
+            target=worker, args=(read, data, deadline, stats['read']),
+        )
+        for _ in range(readers)
+    ] + [
+        threading.Thread(
+            target=worker, args=(write, data, deadline, stats['write']),
+        )
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        kind: {
+            'ops_per_s': len(values['timings']) / duration,
+            'p95_ms': (
+                statistics.quantiles(values['timings'], n=20)[-1] * 1000
+                if len(values['timings']) > 1 else 0
+            ),
+            'errors': values['errors'],
+        }
+        for kind, values in stats.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    # Кэш в памяти процесса: мерим базу, а не общий файловый кэш.
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+    tuned = (dict(settings.SQLITE_PRAGMAS),
+             settings.DATABASES['default'].get('CONN_MAX_AGE', 0))
+    profiles = [('default', ({}, 0)), ('tuned', tuned)]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (pragmas, conn_max_age) in profiles:
+            random.seed(0)
+            configure(
+                os.path.join(directory, '%s.sqlite3' % name),
+                pragmas, conn_max_age,
+            )
+            data = prepare()
+            results[name] = run(
+                args.readers, args.writers, args.duration, data,
+            )
+            configure(':memory:', {}, 0)
+
+    print('%-8s %-6s %10s %9s %7s' % (
+        'профиль', 'тип', 'опер./с', 'p95, мс', 'ошибки',
+    ))
+    for name, kinds in results.items():
+        for kind, values in kinds.items():
+            print('%-8s %-6s %10.1f %9.1f %7d' % (
+                name, kind, values['ops_per_s'], values['p95_ms'],
+                values['errors'],
+            ))
+    for kind in ('read', 'write'):
+        before = results['default'][kind]['ops_per_s']
+        after = results['tuned'][kind]['ops_per_s']
+        print('%s: x%.2f' % (kind, after / before if before else 0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Задержка первых запросов после старта воркера.
+
+    python benchmarks/templates.py [--repeat 20]
+
+Каждый режим запускается в отдельном процессе, как свежий воркер:
+
+- uncached — загрузчики без кэша (как при DEBUG = True): шаблоны
+  читаются и разбираются на каждом запросе;
+- cached — кэширующий загрузчик: разбор при первом использовании;
+- warmed — кэширующий загрузчик и warm_on_boot до первого запроса.
+
+Для каждого адреса выводится время первого запроса и медиана
+следующих; у warmed отдельно — время прогрева при старте.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from utils import setup_django, test_database
+
+MODES = ('uncached', 'cached', 'warmed')
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def configure(mode):
+    from django.conf import settings
+
+    loaders = LOADERS
+    if mode != 'uncached':
+        loaders = [('django.template.loaders.cached.Loader', LOADERS)]
+    settings.TEMPLATES[0]['OPTIONS']['loaders'] = loaders
+    settings.WARM_TEMPLATES = mode == 'warmed'
+    # Кэш страниц не должен прятать отрисовку.
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+    }
+
+
+def seed():
+    from django.contrib.auth import get_user_model
+    from posts.models import Comment, Group, Post
+
+    author = get_user_model().objects.create_user(
+        username='author', first_name='Лев', last_name='Толстой',
+    )
+    group = Group.objects.create(
+        title='Группа', slug='group', description='Описание',
+    )
+    for number in range(20):
+        post = Post.objects.create(
+            text='Пост %s' % number, author=author, group=group,
+        )
+    Comment.objects.create(post=post, author=author, text='Комментарий')
+    return [
+        '/', '/group/group/', '/profile/author/', '/posts/%s/' % post.pk,
+        '/about/author/',
+    ]
+
+
+def child(mode, repeat):
+    """Замер в свежем процессе; результат — JSON в stdout."""
+    setup_django()
+    configure(mode)
+    from django.test import Client
+
+    from core.warmup import warm_on_boot
+
+    result = {'mode': mode, 'warm_ms': 0, 'first_ms': {}, 'steady_ms': {}}
+    with test_database():
+        urls = seed()
+        client = Client()
+        # Как get_wsgi_application при старте воркера.
+        client.handler.load_middleware()
+        if mode == 'warmed':
+            started = time.perf_counter()
+            warm_on_boot()
+            result['warm_ms'] = (time.perf_counter() - started) * 1000
+        for url in urls:
+            started = time.perf_counter()
+            client.get(url)
+            result['first_ms'][url] = (time.perf_counter() - started) * 1000
+        for url in urls:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            result['steady_ms'][url] = statistics.median(timings)
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.repeat)
+        return 0
+
+    results = []
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__),
+             '--child', mode, '--repeat', str(args.repeat)],
+            check=True, stdout=subprocess.PIPE, universal_newlines=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    urls = list(results[0]['first_ms'])
+    print('%-20s' % 'адрес, мс' + ''.join(
+        '%18s' % ('%s 1-й/далее' % result['mode']) for result in results
+    ))
+    for url in urls:
+        print('%-20s' % url + ''.join(
+            '%18s' % ('%.1f / %.1f' % (
+                result['first_ms'][url], result['steady_ms'][url],
+            ))
+            for result in results
+        ))
+    print('%-20s' % 'сумма первых' + ''.join(
+        '%18.1f' % sum(result['first_ms'].values()) for result in results
+    ))
+    print('%-20s' % 'прогрев при старте' + ''.join(
+        '%18.1f' % result['warm_ms'] for result in results
+    ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
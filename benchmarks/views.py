@@ -0,0 +1,301 @@
+"""
+Число запросов, задержка и размер ответа для всех адресов posts.
+
+    python benchmarks/views.py [--scale 1] [--repeat 20] [--save]
+
+Данные (при --scale 1: 10k пользователей, 100k постов, 50k подписок,
+500k комментариев) создаются во временной тестовой базе, каждый адрес
+из posts/urls.py запрашивается тестовым клиентом. Результат
+сравнивается с benchmarks/baseline.json: скрипт завершается с ошибкой,
+если запросов стало больше или задержка и размер ответа выросли
+сильнее порога. С --save результат записывается как новый эталон.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+from utils import ROOT_DIR, setup_django, test_database
+
+BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'baseline.json')
+BATCH_SIZE = 500
+USERS = 10000
+GROUPS = 50
+POSTS = 100000
+FOLLOWS = 50000
+COMMENTS = 500000
+# Рост задержки меньше этого не считается регрессией: шум таймера.
+LATENCY_SLACK_MS = 5
+
+
+def seed(scale):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from faker import Faker
+    from posts.models import Comment, Follow, Group, Post
+
+    random.seed(0)
+    fake = Faker('ru_RU')
+    fake.seed_instance(0)
+    # Небольшой набор текстов: Faker медленный на сотнях тысяч строк.
+    texts = [fake.text(max_nb_chars=400) for _ in range(1000)]
+    User = get_user_model()
+    User.objects.bulk_create(
+        (
+            User(username='user%s' % number, first_name=fake.first_name(),
+                 last_name=fake.last_name())
+            for number in range(int(USERS * scale))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    users = list(User.objects.values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        Group(title='Группа %s' % number, slug='group-%s' % number,
+              description=random.choice(texts))
+        for number in range(GROUPS)
+    )
+    groups = list(Group.objects.values_list('pk', flat=True))
+    Post.objects.bulk_create(
+        (
+            Post(text=random.choice(texts), author_id=random.choice(users),
+                 group_id=random.choice(groups + [None]))
+            for _ in range(int(POSTS * scale))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    posts = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(text=random.choice(texts)[:200],
+                    post_id=random.choice(posts),
+                    author_id=random.choice(users))
+            for _ in range(int(COMMENTS * scale))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    pairs = {
+        tuple(random.sample(users, 2)) for _ in range(int(FOLLOWS * scale))
+    }
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author) for user, author in pairs),
+        batch_size=BATCH_SIZE,
+    )
+    # bulk_create не вызывает сигналы: счётчики авторов и поисковый
+    # индекс строятся заново.
+    call_command('rebuild_author_stats', stdout=io.StringIO())
+    call_command('rebuild_search_index', stdout=io.StringIO())
+
+
+def routes():
+    """
+    Адреса posts/urls.py.
+
+    Каждый адрес — (имя, метод, url, данные, пользователь, подготовка):
+    подготовка вызывается перед каждым запросом и возвращает состояние
+    базы к исходному, чтобы повторы мерили одно и то же.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+    from django.urls import reverse
+    from django.utils.http import urlencode
+    from posts.models import Follow, Group, Post
+    from posts.paginators import NEXT, CursorPaginator
+
+    User = get_user_model()
+    author = User.objects.annotate(
+        total=Count('posts'),
+    ).order_by('-total', 'pk').first()
+    reader = User.objects.annotate(
+        total=Count('follower'),
+    ).order_by('-total', 'pk').first()
+    stranger = User.objects.exclude(
+        pk__in=Follow.objects.filter(user=reader).values('author'),
+    ).exclude(pk=reader.pk).order_by('pk').first()
+    group = Group.objects.annotate(
+        total=Count('post'),
+    ).order_by('-total', 'pk').first()
+    post = Post.objects.filter(author=author).annotate(
+        total=Count('comments'),
+    ).order_by('-total', 'pk').first()
+    follow = Follow.objects.filter(user=reader, author=stranger)
+    staff, _ = User.objects.get_or_create(
+        username='benchmark_staff', defaults={'is_staff': True},
+    )
+    # Следующая страница комментариев — после самого нового.
+    comments_cursor = CursorPaginator.encode_cursor(
+        NEXT, post.comments.order_by('-created', '-id').first(),
+    )
+    # Частое слово: поиск находит много постов.
+    query = re.findall(r'\w+', post.text)[0]
+
+    def unfollowed():
+        follow.delete()
+
+    def followed():
+        Follow.objects.get_or_create(user=reader, author=stranger)
+
+    return [
+        ('index', 'get', reverse('posts:index'), None, None, None),
+        ('index_page_2', 'get', reverse('posts:index') + '?page=2',
+         None, None, None),
+        ('group_list', 'get',
+         reverse('posts:group_list', args=(group.slug,)), None, None, None),
+        ('profile', 'get',
+         reverse('posts:profile', args=(author.username,)),
+         None, None, None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=(post.pk,)), None, None, None),
+        ('post_comments', 'get',
+         reverse('posts:post_comments', args=(post.pk,)) + '?'
+         + urlencode({'cursor': comments_cursor}), None, None, None),
+        ('post_create', 'get', reverse('posts:post_create'),
+         None, author, None),
+        ('post_edit', 'get',
+         reverse('posts:post_edit', args=(post.pk,)), None, author, None),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', args=(post.pk,)),
+         {'text': 'Комментарий из бенчмарка'}, reader, None),
+        ('follow_index', 'get', reverse('posts:follow_index'),
+         None, reader, None),
+        ('search', 'get', reverse('posts:search') + '?'
+         + urlencode({'q': query}), None, None, None),
+        ('export', 'get', reverse('posts:export') + '?'
+         + urlencode({'author': author.username}), None, staff, None),
+        ('api_index', 'get', reverse('posts:api_index'), None, None, None),
+        ('api_group', 'get',
+         reverse('posts:api_group', args=(group.slug,)), None, None, None),
+        ('api_profile', 'get',
+         reverse('posts:api_profile', args=(author.username,)),
+         None, None, None),
+        ('profile_follow', 'get',
+         reverse('posts:profile_follow', args=(stranger.username,)),
+         None, reader, unfollowed),
+        ('profile_unfollow', 'get',
+         reverse('posts:profile_unfollow', args=(stranger.username,)),
+         None, reader, followed),
+    ]
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * len(values))))
+    return values[index]
+
+
+def read_content(response):
+    """Тело ответа; потоковый ответ дочитывается до конца."""
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def measure(repeat):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    for name, method, url, data, user, prepare in routes():
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        request = getattr(client, method)
+        cache.clear()
+        timings = []
+        for attempt in range(repeat):
+            if prepare is not None:
+                prepare()
+            # Журнал запросов при DEBUG хранит не больше 9000 записей:
+            # полный журнал CaptureQueriesContext считает как 0 запросов.
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = request(url, data)
+                content = read_content(response)
+                timings.append((time.perf_counter() - started) * 1000)
+            if attempt == 0:
+                # Холодный кэш: сколько запросов стоит страница без него.
+                results[name] = {
+                    'status': response.status_code,
+                    'queries': len(queries),
+                    'bytes': len(content),
+                }
+        results[name].update(
+            p50_ms=round(statistics.median(timings), 2),
+            p95_ms=round(percentile(timings, 95), 2),
+        )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий относительно эталона."""
+    failures = []
+    for name, current in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if current['queries'] > expected['queries']:
+            failures.append('%s: запросов %s, было %s' % (
+                name, current['queries'], expected['queries'],
+            ))
+        for metric, slack in (
+                ('p50_ms', LATENCY_SLACK_MS),
+                ('p95_ms', LATENCY_SLACK_MS),
+                ('bytes', 0),
+        ):
+            limit = max(
+                expected[metric] * (1 + threshold), expected[metric] + slack,
+            )
+            if current[metric] > limit:
+                failures.append('%s: %s %s, было %s' % (
+                    name, metric, current[metric], expected[metric],
+                ))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--threshold', type=float, default=0.25,
+        help='допустимый рост задержки и размера ответа (доля)',
+    )
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true')
+    args = parser.parse_args()
+    setup_django()
+
+    with test_database():
+        seed(args.scale)
+        results = measure(args.repeat)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.save or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(
+                {'scale': args.scale, 'routes': results},
+                baseline_file, ensure_ascii=False, indent=2, sort_keys=True,
+            )
+            baseline_file.write('\n')
+        print('Эталон записан в %s' % args.baseline)
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline['scale'] != args.scale:
+        sys.exit('Эталон снят при --scale %s' % baseline['scale'])
+    failures = compare(results, baseline['routes'], args.threshold)
+    if failures:
+        print('\n'.join(failures))
+        sys.exit('Регрессия производительности')
+    print('Регрессий нет')
+
+
+if __name__ == '__main__':
+    main()
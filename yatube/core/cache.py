@@ -0,0 +1,152 @@
+import hashlib
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .compression import for_request, prepare_for_cache
+from .metrics import registry
+from .replicas import read_primary
+
+# Сколько держится блокировка пересборки, если воркер упал с ней.
+REBUILD_LOCK_TIMEOUT = 30
+# Сколько остальные воркеры ждут результат пересборки.
+REBUILD_WAIT = 5
+REBUILD_POLL_INTERVAL = 0.05
+
+page_cache_requests = registry.counter(
+    'yatube_page_cache_requests_total',
+    'Обращения к кэшу страниц: hit или miss.',
+    labels=('prefix', 'result'),
+)
+
+
+def generation_key(name):
+    return 'generation:%s' % name
+
+
+def new_generation():
+    # Случайная метка, а не счётчик: если ключ вытеснен из кэша,
+    # новое поколение не совпадёт ни с одним из старых.
+    return uuid.uuid4().hex
+
+
+def get_generation(name):
+    """Текущее поколение данных `name`."""
+    key = generation_key(name)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, new_generation(), None)
+        value = cache.get(key)
+    return value
+
+
+def get_generations(names):
+    """Поколения нескольких данных: {имя: поколение}, одним get_many."""
+    keys = {name: generation_key(name) for name in names}
+    values = cache.get_many(list(keys.values()))
+    return {
+        name: values.get(key) or get_generation(name)
+        for name, key in keys.items()
+    }
+
+
+def bump_generation(name):
+    """Сменить поколение: всё, что закэшировано под старым, устаревает."""
+    cache.set(generation_key(name), new_generation(), None)
+
+
+def bump_generation_on_commit(name):
+    """
+    Сменить поколение сейчас и ещё раз после фиксации транзакции.
+
+    Между сигналом и фиксацией другой воркер может прочитать данные без
+    этой записи и закэшировать их под новым поколением; повторная смена
+    делает такую запись устаревшей.
+    """
+    bump_generation(name)
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+@contextmanager
+def rebuild_lock(key):
+    """
+    Блокировка пересборки ключа: `True`, если пересобирает этот воркер.
+
+    Построена на `cache.add`, поэтому работает между процессами,
+    пока кэш общий.
+    """
+    lock_key = 'rebuild:%s' % key
+    acquired = cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+
+
+def wait_for(key, timeout=REBUILD_WAIT):
+    """Дождаться, пока другой воркер положит значение в кэш."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def page_cache_key(request, key_prefix, generation):
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return 'page:%s:%s:%s:%s' % (key_prefix, generation, user, path)
+
+
+def cache_page_versioned(timeout, key_prefix, generation):
+    """
+    Кэширование страницы до смены поколения `generation`.
+
+    В отличие от `cache_page` страница не живёт фиксированное время:
+    запись сбрасывается сменой поколения (`bump_generation`), а
+    `timeout` лишь ограничивает срок хранения. Анонимные посетители
+    делят одну копию, авторизованные получают свою: в шапке
+    выводится имя пользователя. Отсутствующую страницу пересобирает
+    один воркер, остальные ждут его результат (`rebuild_lock`).
+    Страница хранится сжатой и без лишних пробелов, если это
+    включено (см. core.compression). Страница для кэша собирается
+    по основной базе: реплика может отставать от нового поколения.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            key = page_cache_key(
+                request, key_prefix, get_generation(generation)
+            )
+            response = cache.get(key)
+            page_cache_requests.inc(
+                prefix=key_prefix,
+                result='miss' if response is None else 'hit',
+            )
+            if response is not None:
+                return for_request(request, response)
+            with rebuild_lock(key) as owner:
+                if not owner:
+                    response = wait_for(key)
+                if response is None:
+                    with read_primary():
+                        response = view_func(request, *args, **kwargs)
+                    if (
+                            response.status_code == 200
+                            and not response.streaming
+                    ):
+                        # В кэш — уже сжатой, как её отдаст middleware.
+                        response = prepare_for_cache(response)
+                        cache.set(key, response, timeout)
+            return for_request(request, response)
+        return wrapper
+    return decorator
@@ -0,0 +1,136 @@
+"""
+Сжатие ответов и удаление лишних пробелов из HTML.
+
+CompressionMiddleware включается настройками COMPRESSION_ENABLED
+(gzip для ответов не меньше COMPRESSION_MIN_SIZE байт с уровнем
+COMPRESSION_LEVEL) и HTML_STRIP_WHITESPACE (отступы и пустые строки
+шаблонов). Страницы из кэша (`core.cache.cache_page_versioned`)
+сохраняются уже обработанными, поэтому попадание в кэш не тратит
+процессор на сжатие; клиенту без gzip такая страница распаковывается.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+# Содержимое этих тегов выводится как есть.
+PRESERVED = re.compile(
+    r'(<(pre|textarea|script)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL,
+)
+INDENTED_LINE = re.compile(r'\s*\n\s*')
+STRONG_ETAG = re.compile(r'^"[^"]*"$')
+
+
+def strip_whitespace(html):
+    """Убрать отступы и пустые строки, не трогая pre, textarea и script."""
+    parts = PRESERVED.split(html)
+    # split с двумя группами: текст, целый тег, имя тега, текст, ...
+    stripped = []
+    for number, part in enumerate(parts):
+        kind = number % 3
+        if kind == 0:
+            stripped.append(INDENTED_LINE.sub('\n', part))
+        elif kind == 1:
+            stripped.append(part)
+    return ''.join(stripped).strip()
+
+
+def is_html(response):
+    return response.get('Content-Type', '').startswith('text/html')
+
+
+def is_compressible(response):
+    return (
+        not response.streaming
+        and response.status_code == 200
+        and not response.has_header('Content-Encoding')
+        and response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+        and len(response.content) >= settings.COMPRESSION_MIN_SIZE
+    )
+
+
+def accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def minify(response):
+    if (
+        settings.HTML_STRIP_WHITESPACE
+        and not response.streaming
+        and is_html(response)
+        and not response.has_header('Content-Encoding')
+    ):
+        response.content = strip_whitespace(
+            response.content.decode(response.charset)
+        )
+        response['Content-Length'] = str(len(response.content))
+    return response
+
+
+def compress(response):
+    """Сжать тело ответа gzip, если это имеет смысл."""
+    if not settings.COMPRESSION_ENABLED:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not is_compressible(response):
+        return response
+    compressor = zlib.compressobj(settings.COMPRESSION_LEVEL, wbits=31)
+    content = compressor.compress(response.content) + compressor.flush()
+    if len(content) >= len(response.content):
+        return response
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = 'gzip'
+    # Сжатое тело побайтно отличается от исходного.
+    etag = response.get('ETag')
+    if etag and STRONG_ETAG.match(etag):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+def decompress(response):
+    """Распаковать ответ для клиента, который не принимает gzip."""
+    if response.get('Content-Encoding') != 'gzip' or response.streaming:
+        return response
+    response.content = zlib.decompress(response.content, wbits=31)
+    response['Content-Length'] = str(len(response.content))
+    del response['Content-Encoding']
+    return response
+
+
+def prepare_for_cache(response):
+    """Ответ в том виде, в каком его отдаёт CompressionMiddleware."""
+    return compress(minify(response))
+
+
+def for_request(request, response):
+    """Ответ из кэша для клиента: распакованный, если gzip не принят."""
+    if accepts_gzip(request):
+        return response
+    return decompress(response)
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        if not (
+            settings.COMPRESSION_ENABLED or settings.HTML_STRIP_WHITESPACE
+        ):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding'):
+            return for_request(request, response)
+        minify(response)
+        if accepts_gzip(request):
+            compress(response)
+        elif settings.COMPRESSION_ENABLED:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
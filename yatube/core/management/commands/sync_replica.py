@@ -0,0 +1,39 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Скопировать основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS — локальная замена репликации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'replicas', nargs='*',
+            help='псевдонимы баз; по умолчанию все DATABASES кроме default',
+        )
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or [
+            alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS
+        ]
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Копировать можно только базу SQLite.')
+        primary.ensure_connection()
+        for alias in replicas:
+            if alias not in settings.DATABASES:
+                raise CommandError('Нет базы %r.' % alias)
+            connections[alias].close()
+            target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+            try:
+                # Онлайн-копия: основная база в это время доступна.
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write('%s обновлена' % alias)
+        self.stdout.write(self.style.SUCCESS('Реплики синхронизированы'))
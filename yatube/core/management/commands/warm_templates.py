@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Разобрать все шаблоны из каталогов DIRS. В воркере это заполняет '
+        'кэш загрузчика (см. WARM_TEMPLATES); как отдельная команда — '
+        'проверяет, что шаблоны разбираются без ошибок.'
+    )
+
+    def handle(self, *args, **options):
+        loaded, errors, elapsed = warm_templates()
+        for name, error in errors:
+            self.stderr.write('%s: %s' % (name, error))
+        if errors:
+            raise CommandError('Шаблонов с ошибками: %s' % len(errors))
+        self.stdout.write(self.style.SUCCESS(
+            'Шаблонов разобрано: %s за %.0f мс' % (loaded, elapsed * 1000)
+        ))
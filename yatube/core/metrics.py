@@ -0,0 +1,286 @@
+"""
+Метрики в формате Prometheus.
+
+Каждый поток пишет в свой словарь без блокировок. Раз в
+`FLUSH_INTERVAL` секунд процесс складывает словари потоков и
+записывает итог в файл `<pid>.json` в settings.METRICS_DIR; эндпоинт
+/metrics суммирует файлы всех процессов. Значения монотонны, поэтому
+завершившиеся воркеры остаются в сумме, как у счётчиков Prometheus в
+режиме multiprocess: при сборе их файлы переносятся в один
+`retired.json` и удаляются, так что файлов не больше, чем живых
+процессов. Сбросить счётчики можно, очистив каталог.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from django.conf import settings
+
+FLUSH_INTERVAL = 1
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = '.lock'
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def key(self, labels):
+        return (self.name, tuple(labels[name] for name in self.labels))
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        values = self.registry.thread_values()
+        key = self.key(labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        values = self.registry.thread_values()
+        key = self.key(labels)
+        # Счётчики корзин (последняя — +Inf), сумма и число наблюдений.
+        state = values.get(key)
+        if state is None:
+            state = values[key] = [0] * (len(self.buckets) + 3)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stores = []
+        # Значения завершившихся потоков.
+        self._retired = {}
+        self._pid = os.getpid()
+        self._flushed = 0
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), **kwargs):
+        return self.register(
+            Histogram(self, name, documentation, labels, **kwargs)
+        )
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def thread_values(self):
+        values = getattr(self._local, 'values', None)
+        if values is None or self._pid != os.getpid():
+            values = self._local.values = {}
+            with self._lock:
+                if self._pid != os.getpid():
+                    # После fork значения родителя уже учтены в его файле.
+                    self._pid = os.getpid()
+                    self._stores = []
+                    self._retired = {}
+                self._stores.append((threading.current_thread(), values))
+        return values
+
+    def collect(self):
+        """Сумма значений всех потоков процесса."""
+        with self._lock:
+            alive = []
+            for thread, values in self._stores:
+                if thread.is_alive():
+                    alive.append(values)
+                else:
+                    merge(self._retired, values)
+            self._stores = [
+                store for store in self._stores if store[0].is_alive()
+            ]
+            totals = {}
+            merge(totals, self._retired)
+        for values in alive:
+            merge(totals, dict(values))
+        return totals
+
+    def path(self, pid):
+        return os.path.join(settings.METRICS_DIR, '%s.json' % pid)
+
+    def flush(self):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write_values(self.path(os.getpid()), self.collect())
+        self._flushed = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    def compact(self):
+        """Перенести файлы завершившихся процессов в RETIRED_FILE."""
+        dead = [
+            file_name for file_name in os.listdir(settings.METRICS_DIR)
+            if file_name.endswith('.json')
+            and file_name[:-len('.json')].isdigit()
+            and not is_alive(int(file_name[:-len('.json')]))
+        ]
+        if not dead:
+            return
+        lock_path = os.path.join(settings.METRICS_DIR, LOCK_FILE)
+        with open(lock_path, 'w') as lock:
+            # Иначе два процесса перенесут один файл дважды.
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            retired_path = os.path.join(settings.METRICS_DIR, RETIRED_FILE)
+            retired = read_values(retired_path) or {}
+            paths = []
+            for file_name in dead:
+                path = os.path.join(settings.METRICS_DIR, file_name)
+                values = read_values(path)
+                if values is not None:
+                    merge(retired, values)
+                    paths.append(path)
+            if paths:
+                write_values(retired_path, retired)
+                for path in paths:
+                    os.remove(path)
+
+    def aggregate(self):
+        """Сумма значений всех процессов."""
+        self.flush()
+        self.compact()
+        totals = {}
+        for file_name in os.listdir(settings.METRICS_DIR):
+            if not file_name.endswith('.json'):
+                continue
+            values = read_values(
+                os.path.join(settings.METRICS_DIR, file_name)
+            )
+            if values is not None:
+                merge(totals, values)
+        return totals
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        totals = self.aggregate()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append('# HELP %s %s' % (name, metric.documentation))
+            lines.append('# TYPE %s %s' % (name, metric.kind))
+            samples = sorted(
+                (labels, value) for (sample, labels), value in totals.items()
+                if sample == name
+            )
+            for labels, value in samples:
+                pairs = list(zip(metric.labels, labels))
+                if metric.kind == 'counter':
+                    lines.append(sample_line(name, pairs, value))
+                    continue
+                cumulative = 0
+                bounds = [str(bound) for bound in metric.buckets] + ['+Inf']
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    lines.append(sample_line(
+                        name + '_bucket', pairs + [('le', bound)], cumulative,
+                    ))
+                lines.append(sample_line(name + '_sum', pairs, value[-2]))
+                lines.append(sample_line(name + '_count', pairs, value[-1]))
+        return '\n'.join(lines) + '\n'
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        return True
+    return True
+
+
+def read_values(path):
+    """Значения из файла метрик или None, если файл не читается."""
+    try:
+        with open(path) as metrics_file:
+            data = json.load(metrics_file)
+    except (OSError, ValueError):
+        return None
+    return {(name, tuple(labels)): value for name, labels, value in data}
+
+
+def write_values(path, values):
+    data = [
+        [name, list(labels), value]
+        for (name, labels), value in values.items()
+    ]
+    with open(path + '.tmp', 'w') as metrics_file:
+        json.dump(data, metrics_file)
+    os.replace(path + '.tmp', path)
+
+
+def merge(totals, values):
+    for key, value in values.items():
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = current + value
+
+
+def sample_line(name, labels, value):
+    if labels:
+        name += '{%s}' % ','.join(
+            '%s="%s"' % (label, str(text).replace('"', '\\"'))
+            for label, text in labels
+        )
+    return '%s %s' % (name, value)
+
+
+registry = Registry()
+
+view_latency = registry.histogram(
+    'yatube_view_seconds', 'Время ответа представления.', labels=('view',),
+)
+view_responses = registry.counter(
+    'yatube_view_responses_total', 'Ответы представлений по статусу.',
+    labels=('view', 'status'),
+)
+
+
+def instrument_view(view_func):
+    """Учитывать время и статусы ответов представления."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        match = request.resolver_match
+        view = match.view_name if match else view_func.__name__
+        started = time.perf_counter()
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            view_latency.observe(time.perf_counter() - started, view=view)
+        view_responses.inc(view=view, status=response.status_code)
+        registry.maybe_flush()
+        return response
+    return wrapper
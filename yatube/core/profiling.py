@@ -0,0 +1,239 @@
+"""
+Профилирование запросов: SQL, шаблоны и кэш.
+
+ProfilingMiddleware включается настройкой PROFILING_SAMPLE_RATE (доля
+профилируемых запросов, 0 — выключено). Результат отдаётся в
+заголовке Server-Timing (виден во вкладке Network браузера) и, если
+задан PROFILING_LOG, дописывается строкой JSON в ротируемый лог.
+Вне выбранных запросов перехватчики только проверяют, что запись
+не идёт, поэтому профилирование можно держать включённым на части
+боевого трафика.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+# Сколько повторяющихся запросов выводить в лог.
+DUPLICATES_IN_LOG = 5
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+class Profile:
+    """Показатели одного запроса."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.sql_time = 0
+        self.template_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Глубина вложенных вызовов: include внутри шаблона и общий
+        # уровень TieredCache не должны считаться второй раз.
+        self.depth = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.queries.items() if count > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.duplicates.values())
+
+    def server_timing(self, total):
+        return ', '.join((
+            'sql;dur=%.2f;desc="%s queries, %s duplicate"' % (
+                self.sql_time, self.query_count, self.duplicate_count,
+            ),
+            'tpl;dur=%.2f' % self.template_time,
+            'cache;desc="%s hits, %s misses"' % (
+                self.cache_hits, self.cache_misses,
+            ),
+            'total;dur=%.2f' % total,
+        ))
+
+    def as_dict(self, request, response, total):
+        duplicates = sorted(
+            self.duplicates.items(), key=lambda item: -item[1],
+        )[:DUPLICATES_IN_LOG]
+        return {
+            'time': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total, 2),
+            'sql_queries': self.query_count,
+            'sql_ms': round(self.sql_time, 2),
+            'sql_duplicates': self.duplicate_count,
+            'duplicate_queries': [
+                {'sql': sql, 'count': count} for sql, count in duplicates
+            ],
+            'template_ms': round(self.template_time, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    profile = current_profile()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_time += (time.perf_counter() - started) * 1000
+        profile.queries[sql] += 1
+
+
+def timed(kind):
+    """Учитывать время самого внешнего вызова в `Profile.<kind>_time`."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            profile = current_profile()
+            if profile is None or profile.depth[kind]:
+                return method(*args, **kwargs)
+            profile.depth[kind] += 1
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profile.depth[kind] -= 1
+                elapsed = (time.perf_counter() - started) * 1000
+                setattr(
+                    profile, '%s_time' % kind,
+                    getattr(profile, '%s_time' % kind) + elapsed,
+                )
+        wrapper.profiled = True
+        return wrapper
+    return decorator
+
+
+def counted_get(method):
+    @wraps(method)
+    def wrapper(self, key, default=None, version=None):
+        profile = current_profile()
+        if profile is None or profile.depth['cache']:
+            return method(self, key, default=default, version=version)
+        profile.depth['cache'] += 1
+        try:
+            value = method(self, key, default=default, version=version)
+        finally:
+            profile.depth['cache'] -= 1
+        if value is default:
+            profile.cache_misses += 1
+        else:
+            profile.cache_hits += 1
+        return value
+    wrapper.profiled = True
+    return wrapper
+
+
+def counted_get_many(method):
+    @wraps(method)
+    def wrapper(self, keys, version=None):
+        profile = current_profile()
+        if profile is None or profile.depth['cache']:
+            return method(self, keys, version=version)
+        keys = list(keys)
+        profile.depth['cache'] += 1
+        try:
+            found = method(self, keys, version=version)
+        finally:
+            profile.depth['cache'] -= 1
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """Один раз обернуть рендер шаблонов и чтение из кэшей."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        Template.render = timed('template')(Template.render)
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            for name, wrap in (
+                    ('get', counted_get), ('get_many', counted_get_many),
+            ):
+                method = getattr(backend, name)
+                if not getattr(method, 'profiled', False):
+                    setattr(backend, name, wrap(method))
+        _installed = True
+
+
+def log_handler(path):
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.PROFILING_LOG_MAX_BYTES,
+        backupCount=settings.PROFILING_LOG_BACKUP_COUNT,
+        encoding='utf-8',
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    return handler
+
+
+class ProfilingMiddleware:
+    """Профилирует выбранную долю запросов (PROFILING_SAMPLE_RATE)."""
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.log = settings.PROFILING_LOG
+        install()
+        if self.log and not logger.handlers:
+            logger.addHandler(log_handler(self.log))
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = _local.profile = Profile()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(sql_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        total = (time.perf_counter() - started) * 1000
+        response['Server-Timing'] = profile.server_timing(total)
+        if self.log:
+            logger.info(json.dumps(
+                profile.as_dict(request, response, total), ensure_ascii=False,
+            ))
+        return response
@@ -0,0 +1,112 @@
+"""
+Чтение с реплик базы данных.
+
+ReplicaRouter отправляет чтения на одну из settings.DATABASE_REPLICAS,
+но только внутри GET/HEAD-запросов, которые ReplicaMiddleware пометил
+как безопасные; записи, команды и фоновые потоки всегда работают с
+основной базой. Представления, которые пишут
+(`@pin_primary`), и вход на сайт ставят в сессию отметку: следующие
+PRIMARY_PIN_SECONDS секунд этот пользователь читает с основной базы и
+видит свои изменения, даже если реплика отстаёт.
+
+То, что кладётся в общий кэш, читается с основной базы (`read_primary`):
+иначе отставшая реплика закэширует старые данные под новым поколением
+для всех воркеров.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+
+PIN_SESSION_KEY = '_primary_until'
+# Приложения, которые всегда читаются с основной базы.
+PRIMARY_APPS = {'sessions'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+_use_replicas = ContextVar('use_replicas', default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or not _use_replicas.get()
+            or model._meta.app_label in PRIMARY_APPS
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный с реплики, сохранится туда же.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Во всех базах одни и те же данные.
+        return True
+
+
+@contextmanager
+def read_primary():
+    """Читать с основной базы внутри блока."""
+    token = _use_replicas.set(False)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+def pin(request):
+    """Читать с основной базы ближайшие PRIMARY_PIN_SECONDS секунд."""
+    request.session[PIN_SESSION_KEY] = (
+        time.time() + settings.PRIMARY_PIN_SECONDS
+    )
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def pin_primary(view_func):
+    """Представление пишет: оно и следующие запросы автора — на основной."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with read_primary():
+            response = view_func(request, *args, **kwargs)
+            # Успешная запись заканчивается редиректом.
+            if (
+                response.status_code in (301, 302, 303)
+                and request.user.is_authenticated
+            ):
+                pin(request)
+        return response
+    return wrapper
+
+
+@receiver(user_logged_in)
+def pin_after_login(sender, request, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        pin(request)
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _use_replicas.set(
+            request.method in SAFE_METHODS and not is_pinned(request)
+        )
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replicas.reset(token)
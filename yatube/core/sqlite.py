@@ -0,0 +1,23 @@
+"""
+Настройка соединений SQLite.
+
+Каждое новое соединение получает PRAGMA из settings.SQLITE_PRAGMAS:
+журнал WAL, чтобы запись не блокировала чтение, synchronous=NORMAL
+(в режиме WAL база не портится при сбое, теряются лишь последние
+транзакции), отображение файла в память, кэш страниц и ожидание
+блокировки вместо немедленной ошибки «database is locked». Соединения
+живут CONN_MAX_AGE секунд, поэтому PRAGMA выполняются не на каждый
+запрос.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.cache import bump_generation, cache_page_versioned, get_generation
+from posts.models import Post
+
+User = get_user_model()
+
+
+class VersionedPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        @cache_page_versioned(60, key_prefix='test', generation='test')
+        def view(request):
+            self.calls += 1
+            return HttpResponse(str(self.calls))
+
+        self.view = view
+        self.factory = RequestFactory()
+
+    def get(self, user=None, path='/'):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        return self.view(request).content
+
+    def test_cached_until_generation_changes(self):
+        self.assertEqual(self.get(), b'1')
+        self.assertEqual(self.get(), b'1')
+        self.assertEqual(self.get(path='/?cursor=abc'), b'2')
+        bump_generation('test')
+        self.assertEqual(self.get(), b'3')
+
+    def test_users_cached_separately(self):
+        user = User.objects.create_user(username='user')
+        self.assertEqual(self.get(), b'1')
+        self.assertEqual(self.get(user), b'2')
+        self.assertEqual(self.get(user), b'2')
+
+    def test_generation_survives_eviction(self):
+        """После вытеснения ключа поколение не повторяется."""
+        old = get_generation('test')
+        cache.delete('generation:test')
+        self.assertNotEqual(get_generation('test'), old)
+
+    def test_new_post_visible_on_index(self):
+        """Новый пост сразу виден на закэшированной главной."""
+        author = User.objects.create_user(username='author')
+        self.client.get(reverse('posts:index'))
+        Post.objects.create(text='Свежий пост', author=author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.cache import cache_page_versioned
+from core.cache_backends import SQLiteCache, TieredCache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default-tests',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared-tests',
+    },
+}
+
+
+def tiered(location, **options):
+    options.setdefault('SHARED_CACHE', 'shared')
+    return TieredCache(location, {'OPTIONS': options})
+
+
+@override_settings(CACHES=CACHES)
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.first = tiered('first', LOCAL_MAX_ENTRIES=2)
+        self.second = tiered('second', LOCAL_TIMEOUT=0.1)
+        self.first.clear()
+        self.second.clear()
+
+    def test_local_level_serves_repeated_reads(self):
+        self.first.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.first.get('key'), 'value')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_local_level_is_bounded(self):
+        """Локальный уровень вытесняет давно прочитанные ключи."""
+        for key in ('a', 'b', 'c'):
+            self.first.set(key, key)
+        caches['shared'].clear()
+        self.assertEqual(self.first.get_many(['a', 'b', 'c']), {
+            'b': 'b', 'c': 'c',
+        })
+
+    def test_other_process_sees_update_after_local_timeout(self):
+        self.second.set('key', 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'old')
+        time.sleep(0.15)
+        self.assertEqual(self.second.get('key'), 'new')
+
+    def test_add_decided_by_shared_cache(self):
+        self.assertTrue(self.first.add('lock', 1))
+        self.assertFalse(self.second.add('lock', 1))
+        self.first.delete('lock')
+        self.assertTrue(self.second.add('lock', 1))
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(path, {})
+        self.other = SQLiteCache(path, {})
+
+    def test_values_shared_between_instances(self):
+        self.cache.set_many({'a': [1, 2], 'b': {'c': 3}})
+        self.assertEqual(self.other.get_many(['a', 'b', 'x']), {
+            'a': [1, 2], 'b': {'c': 3},
+        })
+        self.other.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_add_and_expiry(self):
+        self.assertTrue(self.cache.add('lock', 1, 0.1))
+        self.assertFalse(self.other.add('lock', 2))
+        time.sleep(0.15)
+        self.assertIsNone(self.cache.get('lock'))
+        self.assertTrue(self.other.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 2)
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.other.incr('counter', 2), 3)
+        self.assertEqual(self.cache.decr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+
+class SingleFlightTests(TestCase):
+    def test_one_rebuild_for_concurrent_misses(self):
+        """Пустую страницу пересобирает один поток из нескольких."""
+        calls = []
+
+        @cache_page_versioned(60, key_prefix='flight', generation='flight')
+        def view(request):
+            calls.append(1)
+            time.sleep(0.2)
+            return HttpResponse('ok')
+
+        factory = RequestFactory()
+        barrier = threading.Barrier(4)
+        contents = []
+
+        def worker():
+            request = factory.get('/')
+            request.user = AnonymousUser()
+            barrier.wait()
+            contents.append(view(request).content)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(contents, [b'ok'] * 4)
@@ -0,0 +1,77 @@
+import gzip
+import zlib
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.compression import strip_whitespace
+
+
+class StripWhitespaceTests(TestCase):
+    def test_indentation_removed_preformatted_kept(self):
+        html = (
+            '<div>\n    <p>\n      Текст  с пробелами\n    </p>\n\n</div>\n'
+            '<textarea>\n  строка\n    с отступом</textarea>\n'
+            '<pre>  код\n    ещё</pre>'
+        )
+        self.assertEqual(
+            strip_whitespace(html),
+            '<div>\n<p>\nТекст  с пробелами\n</p>\n</div>\n'
+            '<textarea>\n  строка\n    с отступом</textarea>\n'
+            '<pre>  код\n    ещё</pre>',
+        )
+
+
+@override_settings(
+    COMPRESSION_ENABLED=True,
+    HTML_STRIP_WHITESPACE=True,
+    COMPRESSION_MIN_SIZE=200,
+)
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_gzip_when_accepted(self):
+        url = reverse('about:author')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        html = gzip.decompress(response.content).decode()
+        self.assertNotIn('\n  ', html)
+
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertEqual(plain.content.decode(), html)
+
+    def test_small_responses_not_compressed(self):
+        with self.settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            response = self.client.get(
+                reverse('about:author'), HTTP_ACCEPT_ENCODING='gzip',
+            )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_index_cached_compressed(self):
+        url = reverse('posts:index')
+        with mock.patch(
+            'core.compression.zlib.compressobj', wraps=zlib.compressobj,
+        ) as compressobj:
+            first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressobj.call_count, 1)
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(second.content, first.content)
+
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain.content, gzip.decompress(first.content))
+
+
+class CompressionDisabledTests(TestCase):
+    def test_responses_untouched(self):
+        response = self.client.get(
+            reverse('about:author'), HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import RETIRED_FILE, Registry
+
+User = get_user_model()
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.registry = Registry()
+        self.requests = self.registry.counter(
+            'test_requests_total', 'Запросы.', labels=('view',),
+        )
+        self.latency = self.registry.histogram(
+            'test_seconds', 'Время.', buckets=(0.1, 1),
+        )
+
+    def test_threads_and_processes_are_summed(self):
+        """Значения потоков и других процессов складываются."""
+        def work():
+            for _ in range(100):
+                self.requests.inc(view='index')
+            self.latency.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Файл, оставленный другим воркером.
+        with open(os.path.join(METRICS_DIR, '1.json'), 'w') as other:
+            json.dump([['test_requests_total', ['index'], 10]], other)
+
+        text = self.registry.render()
+        self.assertIn('test_requests_total{view="index"} 410', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('test_seconds_bucket{le="1"} 4', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('test_seconds_count 4', text)
+        self.assertIn('# TYPE test_seconds histogram', text)
+
+    def test_dead_workers_compacted(self):
+        """Файлы завершившихся воркеров сливаются в один без потерь."""
+        worker = subprocess.Popen([sys.executable, '-c', ''])
+        worker.wait()
+        dead_path = os.path.join(METRICS_DIR, '%s.json' % worker.pid)
+        with open(dead_path, 'w') as dead:
+            json.dump([['test_requests_total', ['index'], 7]], dead)
+        self.requests.inc(view='index')
+
+        self.assertIn(
+            'test_requests_total{view="index"} 8', self.registry.render(),
+        )
+        self.assertFalse(os.path.exists(dead_path))
+        retired_path = os.path.join(METRICS_DIR, RETIRED_FILE)
+        self.assertTrue(os.path.exists(retired_path))
+        self.addCleanup(os.remove, retired_path)
+        self.assertIn(
+            'test_requests_total{view="index"} 8', self.registry.render(),
+        )
+
+    def test_metrics_restricted(self):
+        """С чужого адреса метрики видны только сотрудникам."""
+        url = reverse('metrics')
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(response.status_code, 403)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_endpoint(self):
+        """Представления posts учитываются и видны на /metrics."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'].split(';')[0], 'text/plain')
+        text = response.content.decode()
+        self.assertIn('yatube_view_seconds_count{view="posts:index"}', text)
+        self.assertIn(
+            'yatube_page_cache_requests_total'
+            '{prefix="index_page",result="hit"}',
+            text,
+        )
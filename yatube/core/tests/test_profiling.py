@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import profiling
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.log_dir, 'profile.jsonl')
+        cache.clear()
+
+    def tearDown(self):
+        for handler in profiling.logger.handlers[:]:
+            profiling.logger.removeHandler(handler)
+            handler.close()
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def middleware(self, view):
+        with self.settings(
+                PROFILING_SAMPLE_RATE=1, PROFILING_LOG=self.log_path,
+        ):
+            return profiling.ProfilingMiddleware(view)
+
+    def log_lines(self):
+        with open(self.log_path, encoding='utf-8') as log:
+            return [json.loads(line) for line in log]
+
+    def test_disabled_by_default(self):
+        """Без PROFILING_SAMPLE_RATE заголовка нет."""
+        response = self.client.get('/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_request_profile(self):
+        """Считаются запросы, повторы, рендер шаблона и обращения к кэшу."""
+        def view(request):
+            for _ in range(3):
+                User.objects.filter(username='nobody').exists()
+            cache.set('profiled', 1)
+            cache.get('profiled')
+            cache.get_many(['profiled', 'missing'])
+            template = Template('{{ x }}')
+            return HttpResponse(template.render(Context({'x': 1})))
+
+        response = self.middleware(view)(RequestFactory().get('/path/'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('3 queries, 2 duplicate', response['Server-Timing'])
+        self.assertIn('2 hits, 1 misses', response['Server-Timing'])
+        line, = self.log_lines()
+        self.assertEqual(line['path'], '/path/')
+        self.assertEqual(line['sql_queries'], 3)
+        self.assertEqual(line['duplicate_queries'][0]['count'], 3)
+        self.assertEqual(line['cache_hits'], 2)
+        self.assertGreater(line['template_ms'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_server_timing_header(self):
+        """При включённом профилировании страницы отдают Server-Timing."""
+        response = self.client.get('/')
+        self.assertIn('tpl;dur=', response['Server-Timing'])
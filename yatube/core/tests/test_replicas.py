@@ -0,0 +1,115 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.replicas import PIN_SESSION_KEY, _use_replicas
+from posts.comments import comments_page
+from posts.counters import FEED_ALL, FeedCounter
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """Данные создаются только в основной базе, реплика пуста."""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk},
+        )
+
+    def unpin(self, client):
+        session = client.session
+        session[PIN_SESSION_KEY] = 0
+        session.save()
+
+    def test_guest_reads_from_replica(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        self.assertEqual(
+            self.guest_client.get(url).status_code, HTTPStatus.NOT_FOUND,
+        )
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(
+                self.guest_client.get(url).status_code, HTTPStatus.OK,
+            )
+
+    def test_writer_pinned_to_primary(self):
+        self.unpin(self.author_client)
+        self.assertEqual(
+            self.author_client.get(self.detail_url).status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+        response = self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'},
+        )
+        self.assertRedirects(response, self.detail_url)
+        self.assertEqual(self.post.comments.count(), 1)
+        response = self.author_client.get(self.detail_url)
+        self.assertContains(response, 'Комментарий')
+        self.assertEqual(
+            self.guest_client.get(self.detail_url).status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+
+    def test_follow_pins_and_pin_expires(self):
+        reader = User.objects.create_user(username='reader')
+        client = Client()
+        client.force_login(reader)
+        self.unpin(client)
+        client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'},
+        ))
+        self.assertTrue(reader.follower.filter(author=self.author).exists())
+        self.assertEqual(
+            client.get(self.detail_url).status_code, HTTPStatus.OK,
+        )
+        self.unpin(client)
+        self.assertEqual(
+            client.get(self.detail_url).status_code, HTTPStatus.NOT_FOUND,
+        )
+
+    def test_outside_requests_primary_only(self):
+        self.assertEqual(router.db_for_read(Post), 'default')
+        post = Post.objects.get(pk=self.post.pk)
+        post._state.db = 'replica'
+        self.assertEqual(router.db_for_write(Post, instance=post), 'default')
+
+    def test_cached_page_built_from_primary(self):
+        """Страница для общего кэша собирается не по отставшей реплике."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост')
+
+    def test_cached_values_read_from_primary(self):
+        Comment.objects.create(
+            text='Комментарий', author=self.author, post=self.post,
+        )
+        token = _use_replicas.set(True)
+        try:
+            comments, _ = comments_page(self.post.pk)
+            count = FeedCounter(FEED_ALL).get(Post.objects.all())
+        finally:
+            _use_replicas.reset(token)
+        self.assertEqual([comment.text for comment in comments],
+                         ['Комментарий'])
+        self.assertEqual(count, 1)
@@ -0,0 +1,17 @@
+from django.db import connection
+from django.test import TestCase
+
+# Значения PRAGMA synchronous: 0 OFF, 1 NORMAL, 2 FULL.
+SYNCHRONOUS_NORMAL = 1
+
+
+class SQLitePragmasTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA %s' % name)
+            return cursor.fetchone()[0]
+
+    def test_connection_tuned(self):
+        self.assertEqual(self.pragma('synchronous'), SYNCHRONOUS_NORMAL)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from core.warmup import warm_on_boot, warm_templates
+
+
+def templates_with_dirs(*dirs):
+    templates = [dict(settings.TEMPLATES[0])]
+    templates[0]['DIRS'] = list(dirs)
+    return templates
+
+
+class WarmTemplatesTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        with open('%s/%s' % (self.directory, name), 'w') as file:
+            file.write(content)
+
+    def test_project_templates_load(self):
+        loaded, errors, _ = warm_templates()
+        self.assertGreater(loaded, 0)
+        self.assertEqual(errors, [])
+
+    def test_command_reports_count(self):
+        out = StringIO()
+        call_command('warm_templates', stdout=out)
+        self.assertIn('Шаблонов разобрано', out.getvalue())
+
+    def test_command_fails_on_broken_template(self):
+        self.write('good.html', '{{ value }}')
+        self.write('broken.html', '{% if %}')
+        with override_settings(TEMPLATES=templates_with_dirs(self.directory)):
+            loaded, errors, _ = warm_templates()
+            self.assertEqual(loaded, 1)
+            self.assertEqual([name for name, _ in errors], ['broken.html'])
+            with self.assertRaises(CommandError):
+                call_command('warm_templates', stderr=StringIO())
+
+    @override_settings(WARM_TEMPLATES=True)
+    def test_warm_on_boot_fills_loader_cache(self):
+        self.write('page.html', 'страница')
+        cached = [(
+            'django.template.loaders.cached.Loader',
+            ['django.template.loaders.filesystem.Loader'],
+        )]
+        templates = templates_with_dirs(self.directory)
+        templates[0]['OPTIONS'] = dict(
+            templates[0]['OPTIONS'], loaders=cached,
+        )
+        with override_settings(TEMPLATES=templates):
+            warm_on_boot()
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertIn('page.html', loader.get_template_cache)
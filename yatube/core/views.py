@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     template = 'core/404.html'
@@ -23,3 +27,21 @@ def csrf_failure(request, reason=''):
 def internal_error(request, *args, **kwargs):
     template = 'core/500.html'
     return render(request, template, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def metrics(request):
+    """
+    Метрики всех процессов в текстовом формате Prometheus.
+
+    Отдаются сборщику с адресов METRICS_ALLOWED_IPS и сотрудникам:
+    каждое чтение пишет файлы метрик на диск.
+    """
+    if (
+        request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS
+        and not request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
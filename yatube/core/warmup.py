@@ -0,0 +1,62 @@
+"""
+Прогрев воркера при старте.
+
+С кэширующим загрузчиком (settings.TEMPLATE_CACHE) шаблон читается
+с диска и разбирается один раз на процесс — но при первом запросе,
+который его использует. `warm_templates` загружает все шаблоны из
+каталогов DIRS движков; команда warm_templates заодно проверяет, что
+они разбираются. `warm_on_boot` вызывается из wsgi.py и, кроме
+шаблонов, импортирует URLconf с представлениями, контекст-процессоры
+и форматы локали — всё, что иначе достаётся первому запросу.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+from django.utils import formats, translation
+
+logger = logging.getLogger(__name__)
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for file_name in sorted(files):
+            if file_name.endswith(TEMPLATE_EXTENSIONS):
+                path = os.path.join(root, file_name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Загрузить шаблоны; вернуть число загруженных, ошибки и время."""
+    started = time.perf_counter()
+    loaded = 0
+    errors = []
+    for engine in engines.all():
+        for directory in getattr(engine, 'dirs', ()):
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as error:
+                    errors.append((name, error))
+                else:
+                    loaded += 1
+    return loaded, errors, time.perf_counter() - started
+
+
+def warm_on_boot():
+    """Прогрев при старте воркера, если включён settings.WARM_TEMPLATES."""
+    if not settings.WARM_TEMPLATES:
+        return
+    get_resolver().url_patterns
+    for engine in engines.all():
+        getattr(engine, 'engine', engine).template_context_processors
+    with translation.override(settings.LANGUAGE_CODE):
+        formats.get_format('DATE_FORMAT')
+    loaded, errors, elapsed = warm_templates()
+    for name, error in errors:
+        logger.error('Шаблон %s не разбирается: %s', name, error)
+    logger.info('Шаблонов разобрано: %s за %.0f мс', loaded, elapsed * 1000)
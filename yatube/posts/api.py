@@ -0,0 +1,119 @@
+"""
+JSON API лент для мобильного клиента.
+
+Отдаёт те же выборки, что index, group_posts и profile, страницами по
+курсору. Версия ленты — время последнего изменения её постов
+(`Post.modified` сдвигается при правке, смене имени автора и готовой
+миниатюре) и число постов, которое меняется при удалении. Из версии
+строятся сильный ETag и Last-Modified (см. posts.conditional).
+Условный запрос получает 304 до того, как прочитана хоть одна строка
+страницы: версия стоит одного запроса MAX(modified) и счётчика ленты
+из кэша.
+"""
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+
+from core.metrics import instrument_view
+
+from .conditional import feed_version, make_etag
+from .counters import FEED_ALL, FEED_GROUP, FeedCounter, FixedCount
+from .models import AuthorStats, Group, Post
+from .paginators import CursorPaginator
+from .thumbnails import attach_thumbnails
+
+API_PAGE_SIZE = 20
+THUMBNAIL_PRESET = 'card'
+
+
+def index_feed():
+    return Post.objects.for_feed(), FeedCounter(FEED_ALL)
+
+
+def group_feed(slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts = Post.objects.filter(group=group).for_feed()
+    return posts, FeedCounter(FEED_GROUP, group.pk)
+
+
+def profile_feed(username):
+    author = get_object_or_404(get_user_model(), username=username)
+    stats = AuthorStats.objects.for_author(author)
+    return author.posts.for_feed(), FixedCount(stats.posts_count)
+
+
+FEEDS = {
+    'index': index_feed,
+    'group': group_feed,
+    'profile': profile_feed,
+}
+
+
+class FeedState:
+    """Выборка ленты и её версия; строится один раз на запрос."""
+
+    def __init__(self, feed, **kwargs):
+        self.posts, counter = FEEDS[feed](**kwargs)
+        self.latest, self.total = feed_version(self.posts, counter)
+
+    @classmethod
+    def for_request(cls, request, feed, **kwargs):
+        state = getattr(request, '_feed_state', None)
+        if state is None:
+            state = request._feed_state = cls(feed, **kwargs)
+        return state
+
+
+def feed_etag(request, feed, **kwargs):
+    state = FeedState.for_request(request, feed, **kwargs)
+    return make_etag(
+        request,
+        state.latest.isoformat() if state.latest else '',
+        state.total,
+    )
+
+
+def feed_last_modified(request, feed, **kwargs):
+    return FeedState.for_request(request, feed, **kwargs).latest
+
+
+def serialize(post):
+    thumbnail = post.thumbnails.get(THUMBNAIL_PRESET)
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'created': post.created.isoformat(),
+        'author': post.author.username,
+        'author_name': post.author.get_full_name(),
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'thumbnail': thumbnail.url if thumbnail else None,
+    }
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    return '%s?%s' % (request.path, urlencode({'cursor': cursor}))
+
+
+@instrument_view
+@require_safe
+@condition(etag_func=feed_etag, last_modified_func=feed_last_modified)
+def feed_api(request, feed, **kwargs):
+    """Страница ленты `feed` в JSON: посты и адреса соседних страниц."""
+    state = FeedState.for_request(request, feed, **kwargs)
+    paginator = CursorPaginator(state.posts, API_PAGE_SIZE)
+    posts = list(paginator.get_page(request.GET.get('cursor')))
+    attach_thumbnails(posts, THUMBNAIL_PRESET)
+    return JsonResponse(
+        {
+            'count': state.total,
+            'next': page_url(request, paginator.next_cursor),
+            'previous': page_url(request, paginator.previous_cursor),
+            'results': [serialize(post) for post in posts],
+        },
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
@@ -0,0 +1,35 @@
+"""Помощники для массовой записи через bulk_create."""
+import itertools
+from contextlib import contextmanager
+
+# SQLite в Django 2.2 не ограничивает пачку сам: больше 500 строк
+# не помещается в один INSERT.
+BATCH_SIZE = 500
+
+
+def batches(iterable, size=BATCH_SIZE):
+    """
+    Разбить поток объектов на списки по `size`.
+
+    bulk_create сам превращает аргумент в список, поэтому длинные
+    генераторы режутся на пачки заранее.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_created(*models):
+    """Разрешить задать `created` вручную вместо auto_now_add."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
@@ -0,0 +1,9 @@
+from core.cache import bump_generation
+
+# Поколение лент: сменяется при любом изменении постов и комментариев.
+FEED_GENERATION = 'posts_feed'
+INDEX_PAGE_TIMEOUT = 60 * 60
+
+
+def invalidate_feeds():
+    bump_generation(FEED_GENERATION)
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .thumbnails import attach_thumbnails
+
+CARD_TEMPLATE = 'posts/includes/post.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def card_key(post):
+    """
+    Ключ карточки: пост и его версия.
+
+    `Post.modified` сдвигается при редактировании поста и при смене
+    имени автора (см. posts.signals), поэтому старые карточки
+    просто перестают читаться и вытесняются кэшем.
+    """
+    return 'post_card:%s:%s' % (post.pk, post.modified.timestamp())
+
+
+def attach_cards(posts):
+    """
+    Подставить постам готовую разметку карточки в `post.card`.
+
+    Все карточки страницы читаются одним `get_many`, отрисовываются
+    только отсутствующие в кэше; миниатюры для них тоже ищутся
+    одним запросом на всю страницу.
+    """
+    posts = list(posts)
+    keys = {card_key(post): post for post in posts}
+    cached = cache.get_many(keys)
+    missing = [post for key, post in keys.items() if key not in cached]
+    attach_thumbnails(missing)
+    rendered = {}
+    for key, post in keys.items():
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(CARD_TEMPLATE, {'post': post})
+            rendered[key] = card
+        post.card = mark_safe(card)
+    if rendered:
+        cache.set_many(rendered, CARD_TIMEOUT)
+    return posts
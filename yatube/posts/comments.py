@@ -0,0 +1,44 @@
+"""
+Комментарии под постом страницами по ключу (created, id).
+
+Первая страница — самая частая — хранится в кэше и удаляется
+сигналами при добавлении или удалении комментария, поэтому для кэша
+она читается с основной базы; следующие страницы читаются курсором
+одним запросом с LIMIT.
+"""
+from django.core.cache import cache
+
+from core.replicas import read_primary
+
+from .models import Comment
+from .paginators import CursorPaginator
+
+COMMENTS_PER_PAGE = 20
+FIRST_PAGE_TIMEOUT = 60 * 60
+
+
+def first_page_key(post_id):
+    return 'post_comments:%s' % post_id
+
+
+def comments_page(post_id, cursor=None):
+    """Комментарии поста и курсор следующей страницы (или None)."""
+    if not cursor:
+        cached = cache.get(first_page_key(post_id))
+        if cached is not None:
+            return cached
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).for_thread(),
+        COMMENTS_PER_PAGE,
+    )
+    if cursor:
+        page = paginator.get_page(cursor)
+        return list(page), paginator.next_cursor
+    with read_primary():
+        result = (list(paginator.page()), paginator.next_cursor)
+    cache.set(first_page_key(post_id), result, FIRST_PAGE_TIMEOUT)
+    return result
+
+
+def invalidate_first_page(post_id):
+    cache.delete(first_page_key(post_id))
@@ -0,0 +1,116 @@
+"""
+Условные GET-запросы для страниц с постами.
+
+Версия страницы считается одним запросом-агрегатом, без чтения постов
+и отрисовки: время последнего изменения постов
+(`Post.modified` сдвигается при правке, смене имени автора и готовой
+миниатюре) и счётчики, которые меняются при удалении. Из версии
+строится ETag (см. `conditional`); браузер или CDN с той же версией
+получает 304.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.http import Http404
+from django.views.decorators.http import condition
+
+from core.cache import get_generation
+
+from .caching import FEED_GENERATION
+from .models import AuthorStats, Group, Post
+
+
+def feed_version(posts, counter):
+    """Время последнего изменения постов ленты и их число."""
+    latest = posts.aggregate(latest=Max('modified'))['latest']
+    return latest, counter.get(posts)
+
+
+def make_etag(request, *parts):
+    """Хэш адреса страницы и частей её версии."""
+    version = '|'.join(
+        [request.get_full_path()] + [str(part) for part in parts]
+    )
+    return hashlib.md5(version.encode()).hexdigest()
+
+
+def conditional(version_func):
+    """
+    Отвечать 304, если версия страницы не изменилась.
+
+    `version_func(request, **kwargs)` возвращает время последнего
+    изменения и список прочих частей версии. В ETag входят также
+    пользователь и CSRF-cookie: от них зависят шапка и формы страницы.
+    ETag слабый — разметка с формой не совпадает побайтно.
+    Last-Modified не отдаётся: время не отражает ни прочие части
+    версии, ни пользователя, и If-Modified-Since получал бы 304 на
+    устаревшую страницу.
+    """
+    def version(request, *args, **kwargs):
+        if not hasattr(request, '_page_version'):
+            request._page_version = version_func(request, *args, **kwargs)
+        return request._page_version
+
+    def etag(request, *args, **kwargs):
+        last_modified, parts = version(request, *args, **kwargs)
+        return 'W/"%s"' % make_etag(
+            request,
+            request.user.pk,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+            last_modified.isoformat() if last_modified else '',
+            *parts
+        )
+
+    def decorator(view_func):
+        return wraps(view_func)(condition(etag_func=etag)(view_func))
+    return decorator
+
+
+def index_version(request):
+    # Удаление поста меняет поколение лент: число постов не нужно.
+    latest = Post.objects.aggregate(latest=Max('modified'))['latest']
+    return latest, [get_generation(FEED_GENERATION)]
+
+
+def group_version(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'title', 'description',
+    ).annotate(
+        latest=Max('post__modified'), total=Count('post'),
+    ).first()
+    if group is None:
+        raise Http404
+    return group['latest'], [
+        group['total'], group['title'], group['description'],
+    ]
+
+
+def profile_version(request, username):
+    author = get_user_model().objects.filter(username=username).values(
+        'stats__posts_count', 'stats__followers_count',
+    ).annotate(latest=Max('posts__modified')).first()
+    if author is None:
+        raise Http404
+    return author['latest'], [
+        author['stats__posts_count'], author['stats__followers_count'],
+    ]
+
+
+def post_version(request, post_id):
+    posts_count = AuthorStats.objects.filter(
+        author=OuterRef('author'),
+    ).values('posts_count')
+    post = Post.objects.filter(pk=post_id).values('modified').annotate(
+        last_comment=Max('comments__created'),
+        comments_total=Count('comments'),
+        posts_count=Subquery(posts_count),
+    ).order_by().first()
+    if post is None:
+        raise Http404
+    changes = [post['modified'], post['last_comment']]
+    return max(change for change in changes if change), [
+        post['comments_total'], post['posts_count'],
+    ]
@@ -0,0 +1,188 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import DatabaseError, connections, router
+from django.utils.functional import cached_property
+
+from core.cache import (bump_generation_on_commit, get_generation,
+                        get_generations, rebuild_lock)
+from core.replicas import read_primary
+
+from .models import Follow
+
+FEED_COUNT_TIMEOUT = 60 * 60 * 24
+# Сколько помнится, что счётчик сдвигали, пока его не было в кэше.
+STALE_TIMEOUT = 30
+FEED_ALL = 'all'
+FEED_GROUP = 'group'
+FEED_FOLLOWER = 'follower'
+
+
+def feed_count_key(feed, pk=None):
+    if pk is None:
+        return 'feed_count:%s' % feed
+    return 'feed_count:%s:%s' % (feed, pk)
+
+
+def stale_key(key):
+    return 'stale:%s' % key
+
+
+def author_posts_generation(author_id):
+    return 'author_posts:%s' % author_id
+
+
+def follows_generation(user_id):
+    return 'follows:%s' % user_id
+
+
+def table_row_estimate(model):
+    """
+    Оценка числа строк таблицы по статистике СУБД.
+
+    Читается из той же базы, что и сами строки (с учётом реплик).
+    Возвращает None, если статистики нет (не было ANALYZE) или
+    бэкенд не поддерживается.
+    """
+    table = model._meta.db_table
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class FeedCounter:
+    """
+    Число постов в ленте, хранимое в кэше.
+
+    Значение считается `COUNT(*)` по основной базе один раз и дальше
+    поддерживается сигналами `Post` (см. posts.signals). При
+    `approximate=True` точное число на промахе кэша считает один
+    воркер, остальные до этого получают оценку из статистики таблицы,
+    если она есть.
+    """
+    def __init__(self, feed, pk=None, approximate=False):
+        self.key = feed_count_key(feed, pk)
+        self.approximate = approximate
+
+    def get(self, posts):
+        count = cache.get(self.key)
+        if count is not None:
+            return count
+        if self.approximate:
+            with rebuild_lock(self.key) as owner:
+                if owner:
+                    return self.count(posts)
+            estimate = table_row_estimate(posts.model)
+            if estimate is not None:
+                return estimate
+        return self.count(posts)
+
+    def count(self, posts):
+        with read_primary():
+            count = posts.count()
+        if (
+            cache.add(self.key, count, FEED_COUNT_TIMEOUT)
+            and cache.get(stale_key(self.key))
+        ):
+            # Пока шёл COUNT, сигнал не нашёл счётчик: пост, сохранённый
+            # в это время, мог не попасть в число. Посчитаем заново.
+            cache.delete(self.key)
+        return count
+
+
+def followed_authors(user_id):
+    """Отсортированные id авторов из подписок пользователя, из кэша."""
+    key = 'followed_authors:%s:%s' % (
+        user_id, get_generation(follows_generation(user_id)),
+    )
+    authors = cache.get(key)
+    if authors is None:
+        with read_primary():
+            authors = sorted(Follow.objects.filter(
+                user_id=user_id,
+            ).values_list('author_id', flat=True))
+        cache.add(key, authors, FEED_COUNT_TIMEOUT)
+    return authors
+
+
+class FollowFeedCounter(FeedCounter):
+    """
+    Число постов ленты подписок пользователя.
+
+    В ключ входят поколения постов всех авторов из подписок: новый или
+    удалённый пост меняет одно поколение автора (`author_posts_changed`),
+    а не ключи всех его подписчиков. Поколения читаются одним get_many.
+    """
+    approximate = False
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    @cached_property
+    def key(self):
+        authors = followed_authors(self.user_id)
+        generations = get_generations(
+            author_posts_generation(author) for author in authors
+        )
+        version = hashlib.md5('|'.join(
+            '%s:%s' % (author, generations[author_posts_generation(author)])
+            for author in authors
+        ).encode()).hexdigest()
+        return feed_count_key(FEED_FOLLOWER, '%s:%s' % (self.user_id, version))
+
+
+class FixedCount:
+    """Счётчик с уже известным значением, например из AuthorStats."""
+    def __init__(self, count):
+        self.count = count
+
+    def get(self, posts):
+        return self.count
+
+
+def feed_keys(post):
+    """Ключи лент, в которые входит пост (кроме лент подписчиков)."""
+    keys = [feed_count_key(FEED_ALL)]
+    if post.group_id:
+        keys.append(feed_count_key(FEED_GROUP, post.group_id))
+    return keys
+
+
+def change_counts(keys, delta):
+    """Сдвинуть счётчики, которые уже есть в кэше."""
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Счётчика нет: посчитается при следующем чтении. Если его
+            # считают прямо сейчас, отметка заставит пересчитать, а
+            # положенный за это время счётчик сдвигается ещё раз.
+            cache.set(stale_key(key), 1, STALE_TIMEOUT)
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                pass
+
+
+def author_posts_changed(author_id):
+    """Посты автора добавлены или удалены: сбросить счётчики подписчиков."""
+    bump_generation_on_commit(author_posts_generation(author_id))
+
+
+def follows_changed(user_id):
+    """Подписки пользователя изменились."""
+    bump_generation_on_commit(follows_generation(user_id))
@@ -0,0 +1,147 @@
+"""
+Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются `.iterator()` порциями по CHUNK_SIZE и сразу
+превращаются в байты NDJSON или CSV (при необходимости сжатые gzip),
+поэтому память не зависит от размера таблиц. Используется командой
+export_posts и представлением posts:export.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE = 2000
+# Сколько байт копить перед отдачей очередного куска.
+BUFFER_SIZE = 64 * 1024
+
+EXPORTS = {
+    'posts': (Post, (
+        ('id', 'pk'),
+        ('created', 'created'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('image', 'image'),
+    )),
+    'comments': (Comment, (
+        ('id', 'pk'),
+        ('created', 'created'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+    )),
+    'follows': (Follow, (
+        ('id', 'pk'),
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    )),
+}
+# Фильтры выгрузки -> поля каждой модели; None — фильтр неприменим.
+FILTERS = {
+    'posts': {
+        'since': 'created__date__gte',
+        'until': 'created__date__lte',
+        'group': 'group__slug',
+        'author': 'author__username',
+    },
+    'comments': {
+        'since': 'created__date__gte',
+        'until': 'created__date__lte',
+        'group': 'post__group__slug',
+        'author': 'author__username',
+    },
+    'follows': {
+        'since': None,
+        'until': None,
+        'group': None,
+        'author': 'author__username',
+    },
+}
+
+
+def rows(kind, **filters):
+    """Строки выгрузки: кортежи значений в порядке `columns(kind)`."""
+    model, columns = EXPORTS[kind]
+    lookups = {
+        FILTERS[kind][name]: value
+        for name, value in filters.items()
+        if value not in (None, '') and FILTERS[kind][name]
+    }
+    queryset = model.objects.filter(**lookups).order_by('pk').values_list(
+        *(field for _, field in columns)
+    )
+    return queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+def columns(kind):
+    return [name for name, _ in EXPORTS[kind][1]]
+
+
+class Echo:
+    """Файл для csv.writer, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(kind, values):
+    names = columns(kind)
+    for row in values:
+        yield json.dumps(
+            dict(zip(names, row)), ensure_ascii=False, default=str,
+        ) + '\n'
+
+
+def csv_lines(kind, values):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns(kind))
+    for row in values:
+        yield writer.writerow(row)
+
+
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
+
+
+def buffered(lines):
+    """Склеить строки в куски по BUFFER_SIZE байт."""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, format='ndjson', gzip=False, **filters):
+    """Куски байт выгрузки `kind` в формате `format`."""
+    lines, _ = FORMATS[format]
+    chunks = buffered(lines(kind, rows(kind, **filters)))
+    return gzipped(chunks) if gzip else chunks
+
+
+def file_name(kind, format, gzip):
+    return '%s.%s%s' % (kind, format, '.gz' if gzip else '')
+
+
+def content_type(format, gzip):
+    return 'application/gzip' if gzip else FORMATS[format][1]
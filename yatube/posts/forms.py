@@ -1,4 +1,5 @@
 from django import forms
+from .export import EXPORTS, FORMATS
 from .models import Post, Comment
 
 
@@ -12,3 +13,29 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ['text', ]
+
+
+class ExportForm(forms.Form):
+    """Параметры выгрузки: что, в каком формате и с какими фильтрами."""
+    model = forms.ChoiceField(
+        choices=[(kind, kind) for kind in EXPORTS], required=False,
+    )
+    format = forms.ChoiceField(
+        choices=[(name, name) for name in FORMATS], required=False,
+    )
+    gzip = forms.BooleanField(required=False)
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+    group = forms.SlugField(required=False)
+    author = forms.CharField(required=False)
+
+    def clean_model(self):
+        return self.cleaned_data['model'] or 'posts'
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'ndjson'
+
+    def export_options(self):
+        """Аргументы для posts.export.export."""
+        options = dict(self.cleaned_data)
+        return options.pop('model'), options
@@ -0,0 +1,286 @@
+"""
+Массовый импорт постов и комментариев из NDJSON или CSV.
+
+Файл читается потоком, строки проверяются полями PostForm/CommentForm,
+а авторы, группы и посты ищутся пачкой на всю порцию строк и
+запоминаются в кэше. Порция записывается одним bulk_create в своей
+транзакции; картинки порции копируются в хранилище пулом потоков.
+Картинки проверяются полем формы так же, как при загрузке на сайте.
+bulk_create не вызывает сигналы, поэтому после импорта статистика,
+поисковый индекс, ленты подписчиков и миниатюры обновляются отдельно.
+"""
+import csv
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import thumbnails, timeline
+from .bulk import BATCH_SIZE, batches, explicit_created
+from .forms import CommentForm, PostForm
+from .models import Comment, Group, Post
+from .search import index_posts
+
+User = get_user_model()
+IMAGE_WORKERS = 4
+# Сколько ошибок в строках показывать в отчёте.
+ERRORS_IN_REPORT = 20
+
+
+def read_rows(path):
+    """Строки NDJSON или CSV словарями; .gz распаковывается на лету."""
+    opener = gzip.open if path.endswith('.gz') else open
+    name = path[:-3] if path.endswith('.gz') else path
+    with opener(path, 'rt', encoding='utf-8', newline='') as source:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Lookup:
+    """Кэш «значение -> pk», дозаполняемый одним запросом на порцию."""
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.cache = {}
+
+    def load(self, values):
+        missing = {value for value in values if value} - set(self.cache)
+        if not missing:
+            return
+        found = dict(self.queryset.filter(**{
+            '%s__in' % self.field: missing,
+        }).values_list(self.field, 'pk'))
+        for value in missing:
+            self.cache[value] = found.get(value)
+
+    def get(self, value):
+        return self.cache.get(value)
+
+
+class Report:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.read = 0
+        self.created = 0
+        self.images = 0
+        self.errors = []
+
+    def error(self, line, message):
+        if len(self.errors) < ERRORS_IN_REPORT:
+            self.errors.append('строка %s: %s' % (line, message))
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def lines(self):
+        rate = self.created / self.elapsed if self.elapsed else 0
+        lines = [
+            'Прочитано строк: %s' % self.read,
+            'Создано записей: %s' % self.created,
+            'Пропущено строк: %s' % (self.read - self.created),
+            'Скопировано картинок: %s' % self.images,
+            'Время: %.1f с, %.0f записей/с' % (self.elapsed, rate),
+        ]
+        return lines + self.errors
+
+
+class Importer:
+    model = None
+    form_class = None
+    form_fields = ('text',)
+
+    def __init__(self, batch_size=BATCH_SIZE, images_dir=None,
+                 workers=IMAGE_WORKERS):
+        self.batch_size = batch_size
+        self.images_dir = images_dir
+        self.workers = workers
+        self.authors = Lookup(User.objects.all(), 'username')
+        self.report = Report()
+
+    def run(self, rows):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self.executor = executor
+            numbered = enumerate(rows, start=1)
+            for batch in batches(numbered, self.batch_size):
+                self.report.read += len(batch)
+                objects = self.build(batch)
+                with transaction.atomic(), explicit_created(self.model):
+                    self.model.objects.bulk_create(objects)
+                self.report.created += len(objects)
+        return self.report
+
+    def validate(self, line, row):
+        """Проверка полей так же, как при сохранении формы на сайте."""
+        form = self.form_class({
+            name: row.get(name, '') for name in self.form_fields
+        })
+        for name in set(form.fields) - set(self.form_fields):
+            del form.fields[name]
+        if not form.is_valid():
+            self.report.error(line, form.errors.as_text())
+            return None
+        return form.cleaned_data
+
+    def created(self, line, row):
+        value = row.get('created')
+        if not value:
+            return timezone.now()
+        created = parse_datetime(value)
+        if created is None:
+            self.report.error(line, 'неверная дата %r' % value)
+        elif timezone.is_naive(created):
+            created = timezone.make_aware(created)
+        return created
+
+    def author(self, line, row):
+        author = self.authors.get(row.get('author'))
+        if author is None:
+            self.report.error(line, 'нет автора %r' % row.get('author'))
+        return author
+
+    def load(self, batch):
+        """Найти связанные записи порции одним запросом на таблицу."""
+        self.authors.load(row.get('author') for _, row in batch)
+
+    def fields(self, line, row):
+        """Остальные поля модели; None, если строка с ошибкой."""
+        return {}
+
+    def valid(self, batch):
+        """Пары (номер строки, строка, объект) для строк без ошибок."""
+        self.load(batch)
+        for line, row in batch:
+            data = self.validate(line, row)
+            author = self.author(line, row)
+            created = self.created(line, row)
+            fields = self.fields(line, row)
+            if None in (data, author, created, fields):
+                continue
+            yield line, row, self.model(
+                text=data['text'], author_id=author, created=created,
+                **fields,
+            )
+
+    def build(self, batch):
+        return [obj for _, _, obj in self.valid(batch)]
+
+    def finish(self):
+        """Обновить то, что при обычном сохранении делают сигналы."""
+
+
+class PostImporter(Importer):
+    model = Post
+    form_class = PostForm
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.groups = Lookup(Group.objects.all(), 'slug')
+        self.first_pk = (
+            Post.objects.order_by('-pk').values_list('pk', flat=True).first()
+            or 0
+        ) + 1
+
+    def copy_image(self, source):
+        if not os.path.isabs(source) and self.images_dir:
+            source = os.path.join(self.images_dir, source)
+        with open(source, 'rb') as image:
+            self.form_class.base_fields['image'].clean(File(image))
+            image.seek(0)
+            return default_storage.save(
+                'posts/%s' % os.path.basename(source), File(image),
+            )
+
+    def load(self, batch):
+        super().load(batch)
+        self.groups.load(row.get('group') for _, row in batch)
+
+    def fields(self, line, row):
+        group = self.groups.get(row.get('group'))
+        if row.get('group') and group is None:
+            self.report.error(line, 'нет группы %r' % row['group'])
+            return None
+        return {'group_id': group}
+
+    def build(self, batch):
+        valid = list(self.valid(batch))
+        copies = {
+            line: self.executor.submit(self.copy_image, row['image'])
+            for line, row, _ in valid if row.get('image')
+        }
+        objects = []
+        for line, row, post in valid:
+            if line in copies:
+                try:
+                    post.image = copies[line].result()
+                except OSError as error:
+                    self.report.error(line, 'картинка: %s' % error)
+                    continue
+                except ValidationError as error:
+                    self.report.error(
+                        line, 'картинка: %s' % ' '.join(error.messages),
+                    )
+                    continue
+                self.report.images += 1
+            objects.append(post)
+        return objects
+
+    def finish(self):
+        """
+        Поиск, ленты и миниатюры импортированных постов.
+
+        Вызывается после rebuild_author_stats: по статистике видно, чьи
+        посты раскладываются по лентам. Миниатюры режутся в фоне;
+        не успевшие до выхода команды готовит generate_thumbnails.
+        """
+        imported = Post.objects.filter(pk__gte=self.first_pk)
+        index_posts(imported.only('pk', 'text').iterator())
+        timeline.bulk_inserted(imported.values('author').distinct())
+        for post in imported.exclude(image='').only('pk', 'image').iterator():
+            thumbnails.schedule(post)
+
+
+class CommentImporter(Importer):
+    model = Comment
+    form_class = CommentForm
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.posts = Lookup(Post.objects.all(), 'pk')
+
+    def load(self, batch):
+        super().load(batch)
+        self.posts.load(
+            int(row['post']) for _, row in batch
+            if str(row.get('post', '')).isdigit()
+        )
+
+    def fields(self, line, row):
+        post = self.posts.get(
+            int(row['post']) if str(row.get('post', '')).isdigit()
+            else None
+        )
+        if post is None:
+            self.report.error(line, 'нет поста %r' % row.get('post'))
+            return None
+        return {'post_id': post}
+
+
+IMPORTERS = {
+    'posts': PostImporter,
+    'comments': CommentImporter,
+}
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORTS, FORMATS, export
+from posts.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = 'Выгрузить посты, комментарии или подписки в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(EXPORTS), default='posts')
+        parser.add_argument(
+            '--format', choices=list(FORMATS), default='ndjson',
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--since', help='с даты, ГГГГ-ММ-ДД')
+        parser.add_argument('--until', help='по дату включительно')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument(
+            '--output', default='-', help='файл; по умолчанию stdout',
+        )
+
+    def handle(self, *args, **options):
+        form = ExportForm(options)
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        kind, export_options = form.export_options()
+        if options['output'] == '-':
+            self.write(sys.stdout.buffer, kind, export_options)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(output, kind, export_options)
+
+    def write(self, output, kind, options):
+        for chunk in export(kind, **options):
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate, ready_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Подготовить недостающие миниатюры картинок постов.'
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True,
+        ).distinct()
+        total = 0
+        for name in names.iterator():
+            if ready_thumbnail(name, 'card') is None:
+                generate(name)
+                total += 1
+        self.stdout.write(self.style.SUCCESS(
+            'Подготовлено миниатюр: %s' % total
+        ))
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts.bulk import BATCH_SIZE
+from posts.imports import IMAGE_WORKERS, IMPORTERS, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортировать посты или комментарии из NDJSON или CSV '
+        '(в том числе .gz). Колонки постов: author, group, text, '
+        'created, image; комментариев: post, author, text, created. '
+        'Миниатюры режутся в фоне, недостающие готовит generate_thumbnails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--model', choices=list(IMPORTERS), default='posts',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--images-dir', help='откуда брать картинки с относительным путём',
+        )
+        parser.add_argument('--workers', type=int, default=IMAGE_WORKERS)
+
+    def handle(self, *args, **options):
+        importer = IMPORTERS[options['model']](
+            batch_size=options['batch_size'],
+            images_dir=options['images_dir'],
+            workers=options['workers'],
+        )
+        report = importer.run(read_rows(options['path']))
+        # bulk_create не вызывает сигналы: счётчики пересчитываются,
+        # закэшированные ленты и страницы сбрасываются.
+        call_command('rebuild_author_stats', stdout=self.stdout)
+        importer.finish()
+        cache.clear()
+        for line in report.lines():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('Импорт завершён'))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.bulk import BATCH_SIZE
+from posts.models import AuthorStats, Comment, Follow, Post
+
+
+def grouped_counts(model):
+    return dict(
+        model.objects.order_by().values_list('author').annotate(
+            total=Count('pk'),
+        )
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать статистику авторов по базе.'
+
+    def handle(self, *args, **options):
+        posts = grouped_counts(Post)
+        comments = grouped_counts(Comment)
+        followers = grouped_counts(Follow)
+        author_ids = get_user_model().objects.values_list('pk', flat=True)
+        stats = (
+            AuthorStats(
+                author_id=author_id,
+                posts_count=posts.get(author_id, 0),
+                comments_count=comments.get(author_id, 0),
+                followers_count=followers.get(author_id, 0),
+            )
+            for author_id in author_ids.iterator()
+        )
+        with transaction.atomic():
+            AuthorStats.objects.all().delete()
+            AuthorStats.objects.bulk_create(stats, BATCH_SIZE)
+        self.stdout.write(self.style.SUCCESS(
+            'Статистика пересчитана: %s авторов' % AuthorStats.objects.count()
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, SearchTerm
+from posts.search import index_posts
+
+
+class Command(BaseCommand):
+    help = 'Построить поисковый индекс постов заново.'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('pk', 'text').order_by('pk')
+        with transaction.atomic():
+            SearchTerm.objects.all().delete()
+            index_posts(posts.iterator())
+        self.stdout.write(self.style.SUCCESS(
+            'Проиндексировано постов: %s' % posts.count()
+        ))
@@ -0,0 +1,240 @@
+import io
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from posts import timeline
+from posts.bulk import BATCH_SIZE, batches, explicit_created
+from posts.models import Comment, Follow, Group, Post
+
+IMAGE_SIZE = (1200, 800)
+
+
+def power_law_weights(total, alpha):
+    """Накопленные веса закона Ципфа: k-й элемент весит 1 / k^alpha."""
+    return list(itertools.accumulate(
+        1 / rank ** alpha for rank in range(1, total + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Создать синтетические данные для нагрузочного тестирования: '
+        'пользователей, группы, посты, комментарии и подписки. '
+        'Популярность авторов и групп распределена по степенному закону.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=500000)
+        parser.add_argument(
+            '--author-alpha', type=float, default=1.2,
+            help='показатель степени для популярности авторов',
+        )
+        parser.add_argument(
+            '--group-alpha', type=float, default=1.0,
+            help='показатель степени для размера групп',
+        )
+        parser.add_argument(
+            '--no-group', type=float, default=0.3,
+            help='доля постов без группы',
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='сколько разных картинок-заглушек создать',
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.3,
+            help='доля постов с картинкой, если --images больше нуля',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='за сколько дней распределить даты публикаций',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+        prefix = options['prefix']
+
+        with self.step('Пользователи'):
+            users = self.create_users(prefix, options['users'])
+        with self.step('Группы'):
+            groups = self.create_groups(prefix, options['groups'])
+        with self.step('Картинки'):
+            images = self.create_images(prefix, options['images'])
+        # Популярные авторы и группы — в начале списков.
+        self.random.shuffle(users)
+        author_weights = power_law_weights(
+            len(users), options['author_alpha'],
+        )
+        with self.step('Посты'):
+            self.create_posts(
+                options['posts'], users, author_weights,
+                groups, options['group_alpha'], options['no_group'],
+                images, options['image_ratio'],
+            )
+        with self.step('Комментарии'):
+            self.create_comments(options['comments'], users)
+        with self.step('Подписки'):
+            self.create_follows(options['follows'], users, author_weights)
+
+        # bulk_create не вызывает сигналы: статистика авторов, ленты
+        # подписок и поисковый индекс строятся заново, закэшированные
+        # счётчики и страницы сбрасываются.
+        call_command('rebuild_author_stats', stdout=io.StringIO())
+        with self.step('Ленты подписок'):
+            self.fill_timelines(prefix)
+        with self.step('Поисковый индекс'):
+            call_command('rebuild_search_index', stdout=io.StringIO())
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    @contextmanager
+    def step(self, title):
+        started = time.monotonic()
+        yield
+        self.stdout.write('%s: %.1f с' % (title, time.monotonic() - started))
+
+    def random_created(self):
+        return self.now - timedelta(seconds=self.random.random() * self.period)
+
+    def create_users(self, prefix, total):
+        User = get_user_model()
+        User.objects.bulk_create(
+            (
+                User(
+                    username='%s_user_%s' % (prefix, number),
+                    first_name='Имя%s' % number,
+                    last_name='Фамилия%s' % number,
+                )
+                for number in range(total)
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return list(User.objects.filter(
+            username__startswith='%s_user_' % prefix,
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_groups(self, prefix, total):
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title='Группа %s' % number,
+                    slug='%s-group-%s' % (prefix, number),
+                    description='Описание группы %s' % number,
+                )
+                for number in range(total)
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return list(Group.objects.filter(
+            slug__startswith='%s-group-' % prefix,
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_images(self, prefix, total):
+        """Картинки-заглушки разного цвета в хранилище медиафайлов."""
+        names = []
+        for number in range(total):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            image = Image.new('RGB', IMAGE_SIZE, color)
+            ImageDraw.Draw(image).text((20, 20), str(number), fill='white')
+            content = io.BytesIO()
+            image.save(content, 'JPEG')
+            names.append(default_storage.save(
+                'posts/%s_%s.jpg' % (prefix, number),
+                ContentFile(content.getvalue()),
+            ))
+        return names
+
+    def create_posts(self, total, users, author_weights, groups,
+                     group_alpha, no_group, images, image_ratio):
+        group_weights = power_law_weights(len(groups), group_alpha)
+
+        def posts():
+            for number in range(total):
+                author, = self.random.choices(
+                    users, cum_weights=author_weights,
+                )
+                group = None
+                if groups and self.random.random() >= no_group:
+                    group, = self.random.choices(
+                        groups, cum_weights=group_weights,
+                    )
+                image = ''
+                if images and self.random.random() < image_ratio:
+                    image = self.random.choice(images)
+                yield Post(
+                    text='Синтетический пост %s' % number,
+                    author_id=author,
+                    group_id=group,
+                    image=image,
+                    created=self.random_created(),
+                )
+
+        with explicit_created(Post):
+            for batch in batches(posts(), self.batch_size):
+                Post.objects.bulk_create(batch)
+
+    def create_comments(self, total, users):
+        posts = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        if not posts:
+            return
+        # Обсуждают в основном немногие посты.
+        post_weights = power_law_weights(len(posts), 1.0)
+        self.random.shuffle(posts)
+
+        def comments():
+            for number in range(total):
+                post, = self.random.choices(posts, cum_weights=post_weights)
+                yield Comment(
+                    post_id=post,
+                    author_id=self.random.choice(users),
+                    text='Комментарий %s' % number,
+                    created=self.random_created(),
+                )
+
+        with explicit_created(Comment):
+            for batch in batches(comments(), self.batch_size):
+                Comment.objects.bulk_create(batch)
+
+    def create_follows(self, total, users, author_weights):
+        """Подписки: читатели случайные, авторы — по популярности."""
+        def follows():
+            for _ in range(total):
+                user = self.random.choice(users)
+                author, = self.random.choices(
+                    users, cum_weights=author_weights,
+                )
+                if user != author:
+                    yield Follow(user_id=user, author_id=author)
+
+        for batch in batches(follows(), self.batch_size):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def fill_timelines(self, prefix):
+        """Разложить последние посты авторов по лентам подписчиков."""
+        timeline.fill(list(Follow.objects.filter(
+            user__username__startswith='%s_user_' % prefix,
+        ).values_list('user', flat=True).distinct()))
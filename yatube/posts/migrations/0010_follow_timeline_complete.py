@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_modified_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='timeline_complete',
+            field=models.BooleanField(default=False, verbose_name='Лента заполнена'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_follow_timeline_complete'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created'], name='posts_post_created_8d50e8_idx'),
+        ),
+    ]
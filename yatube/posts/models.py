@@ -6,6 +6,37 @@ from core.models import CreatedModel
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    """Планы запросов для страниц с постами."""
+
+    # Поля, которые выводит карточка поста и ссылки под ней.
+    FEED_FIELDS = (
+        'text', 'created', 'modified', 'image', 'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug',
+    )
+    DETAIL_FIELDS = FEED_FIELDS + ('group__title',)
+
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN, только нужные поля."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        """Пост для страницы поста; комментарии читаются страницами."""
+        return self.select_related('author', 'group').only(
+            *self.DETAIL_FIELDS
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    # Поля, которые выводит комментарий.
+    THREAD_FIELDS = ('post', 'text', 'created', 'author__username')
+
+    def for_thread(self):
+        """Комментарии под постом: автор одним JOIN."""
+        return self.select_related('author').only(*self.THREAD_FIELDS)
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -30,10 +61,24 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # Общая лента: ORDER BY created, id без сортировки таблицы.
+            models.Index(fields=['created']),
+            models.Index(fields=['group', 'created']),
+            models.Index(fields=['author', 'created']),
+            # Версия ленты для ETag в API: MAX(modified) по индексу.
+            models.Index(fields=['modified']),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -81,9 +126,14 @@ class Comment(CreatedModel):
         help_text='Введите текст комментария',
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta(CreatedModel.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created']),
+        ]
 
 
 class Follow(models.Model):
@@ -99,7 +149,114 @@ class Follow(models.Model):
         verbose_name='Автор',
         related_name='following',
     )
+    # Все посты автора, не старше ленты, разложены в ленту пользователя.
+    timeline_complete = models.BooleanField(
+        'Лента заполнена',
+        default=False,
+    )
 
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class AuthorStatsManager(models.Manager):
+    def for_author(self, author):
+        """Статистика автора; при отсутствии записи считается по базе."""
+        try:
+            return self.get(author=author)
+        except self.model.DoesNotExist:
+            stats, _ = self.get_or_create(
+                author=author,
+                defaults=self.model.collect(author),
+            )
+            return stats
+
+    def change(self, author_id, **deltas):
+        """Атомарно сдвинуть счётчики, если запись уже есть."""
+        self.filter(author_id=author_id).update(**{
+            field: models.F(field) + delta
+            for field, delta in deltas.items()
+        })
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора, поддерживаются сигналами."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+
+    objects = AuthorStatsManager()
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    @staticmethod
+    def collect(author):
+        return {
+            'posts_count': Post.objects.filter(author=author).count(),
+            'comments_count': Comment.objects.filter(author=author).count(),
+            'followers_count': Follow.objects.filter(author=author).count(),
+        }
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created']),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса: основа слова в тексте поста."""
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост',
+    )
+    count = models.PositiveIntegerField('Вхождений')
+
+    class Meta:
+        verbose_name = 'Слово поиска'
+        verbose_name_plural = 'Слова поиска'
+        unique_together = ('term', 'post')
@@ -0,0 +1,130 @@
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CountedPaginator(Paginator):
+    """Paginator, берущий общее число постов у счётчика ленты."""
+    def __init__(self, object_list, per_page, counter=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        if self.counter is None:
+            return super().count
+        return self.counter.get(self.object_list)
+
+
+class CursorPaginator(CountedPaginator):
+    """
+    Постраничный вывод по ключу (created, id).
+
+    Страница читается одним запросом `WHERE (created, id) < ключ LIMIT n`,
+    поэтому стоимость не зависит от глубины, а COUNT(*) не выполняется.
+    Один экземпляр обслуживает одну страницу: состояние соседних страниц
+    (`next_cursor`, `previous_cursor`) хранится в самом пагинаторе.
+    Номер страницы условный: 1 — начало ленты, 2 — любая следующая;
+    этого достаточно, чтобы `has_next`/`has_previous` стандартного `Page`
+    работали без подсчёта строк.
+    """
+    is_cursor = True
+    ordering = ('-created', '-id')
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+        self._has_next = False
+
+    @staticmethod
+    def encode_cursor(direction, obj):
+        value = '{}{}|{}'.format(direction, obj.created.isoformat(), obj.pk)
+        return urlsafe_base64_encode(force_bytes(value))
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            value = force_text(urlsafe_base64_decode(cursor))
+            created, pk = value[1:].rsplit('|', 1)
+            direction, created, pk = value[0], parse_datetime(created), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise InvalidCursor('Некорректный курсор')
+        if direction not in (NEXT, PREVIOUS) or created is None:
+            raise InvalidCursor('Некорректный курсор')
+        return direction, created, pk
+
+    def page(self, cursor=None):
+        """Вернуть страницу по курсору; без курсора — начало ленты."""
+        if not cursor:
+            return self._window(NEXT, None)
+        direction, created, pk = self.decode_cursor(cursor)
+        return self._window(direction, (created, pk))
+
+    def get_page(self, cursor=None):
+        """Как `page()`, но при битом курсоре отдаёт начало ленты."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    @staticmethod
+    def key_filter(direction, key, pk_field='pk'):
+        """Условие «дальше ключа» в направлении обхода."""
+        created, pk = key
+        lookup = 'lt' if direction == NEXT else 'gt'
+        return Q(**{'created__' + lookup: created}) | Q(**{
+            'created': created, '%s__%s' % (pk_field, lookup): pk,
+        })
+
+    @classmethod
+    def window_rows(cls, posts, direction, key, limit):
+        """Первые `limit` строк выборки после ключа в порядке обхода."""
+        posts = posts.order_by(*cls.ordering)
+        if key is not None:
+            posts = posts.filter(cls.key_filter(direction, key))
+        if direction == PREVIOUS:
+            posts = posts.reverse()
+        return list(posts[:limit])
+
+    def rows(self, direction, key, limit):
+        return self.window_rows(self.object_list, direction, key, limit)
+
+    def _window(self, direction, key):
+        rows = self.rows(direction, key, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            if not rows:
+                return self._window(NEXT, None)
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, key is not None
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(NEXT, rows[-1])
+        if rows and has_previous:
+            self.previous_cursor = self.encode_cursor(PREVIOUS, rows[0])
+        self._number = 2 if has_previous else 1
+        self._has_next = bool(self.next_cursor)
+        return self._get_page(rows, self._number, self)
+
+    def validate_number(self, number):
+        return number
+
+    @property
+    def num_pages(self):
+        # Известны только текущая страница и наличие следующей.
+        return self._number + self._has_next
@@ -0,0 +1,162 @@
+"""
+Полнотекстовый поиск по постам.
+
+Инвертированный индекс хранится в таблице SearchTerm: основа слова
+(стеммер Портера для русского языка), пост и число вхождений. Индекс
+обновляется сигналами при сохранении поста, удаляется вместе с
+постом. Запрос — слова через пробел, все они должны встретиться в
+посте; `слово*` ищет по префиксу. Результаты ранжируются по TF-IDF.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db.models import (Case, F, FloatField, IntegerField, Max,
+                              OuterRef, Q, Subquery, Sum, Value, When)
+
+from .bulk import BATCH_SIZE, batches
+from .counters import FEED_ALL, FeedCounter
+from .models import Post, SearchTerm
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+
+WORD = re.compile(r'\w+\*?')
+VOWELS = 'аеиоуыэюя'
+RV = re.compile(r'^(.*?[%s])(.*)$' % VOWELS)
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'.*[^%s]+[%s].*ость?$' % (VOWELS, VOWELS))
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    """Основа слова по алгоритму Портера для русского языка."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    without_gerund = PERFECTIVE_GERUND.sub('', rv, 1)
+    if without_gerund != rv:
+        rv = without_gerund
+    else:
+        rv = REFLEXIVE.sub('', rv, 1)
+        without_adjective = ADJECTIVE.sub('', rv, 1)
+        if without_adjective != rv:
+            rv = PARTICIPLE.sub('', without_adjective, 1)
+        else:
+            without_verb = VERB.sub('', rv, 1)
+            if without_verb != rv:
+                rv = without_verb
+            else:
+                rv = NOUN.sub('', rv, 1)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_ENDING.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def terms(text):
+    """Основы слов текста с числом вхождений."""
+    return Counter(
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in WORD.findall(text.lower())
+        if not word.endswith('*')
+    )
+
+
+def index_post(post):
+    """Переиндексировать текст поста."""
+    SearchTerm.objects.filter(post=post).delete()
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(term=term, post=post, count=count)
+            for term, count in terms(post.text).items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def index_posts(posts):
+    """Добавить в индекс посты, которых в нём ещё нет."""
+    entries = (
+        SearchTerm(term=term, post_id=post.pk, count=count)
+        for post in posts
+        for term, count in terms(post.text).items()
+    )
+    for batch in batches(entries):
+        SearchTerm.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def parse_query(query):
+    """Условия на SearchTerm для каждого слова запроса."""
+    conditions = []
+    for word in WORD.findall(query.lower())[:MAX_QUERY_TERMS]:
+        if word.endswith('*'):
+            prefix = stem(word[:-1])[:MAX_TERM_LENGTH]
+            # Диапазон вместо LIKE: так работает индекс по term.
+            conditions.append(
+                Q(term__gte=prefix, term__lt=prefix + '\uffff')
+            )
+        else:
+            conditions.append(Q(term=stem(word)[:MAX_TERM_LENGTH]))
+    return conditions
+
+
+def search_posts(query):
+    """Посты, содержащие все слова запроса, от самых релевантных."""
+    conditions = parse_query(query)
+    if not conditions:
+        return Post.objects.none()
+    total = FeedCounter(FEED_ALL).get(Post.objects.all()) or 1
+    matches = Q()
+    weights = []
+    required = {}
+    for number, condition in enumerate(conditions):
+        found = SearchTerm.objects.filter(condition).values('post')
+        documents = found.distinct().count()
+        if not documents:
+            return Post.objects.none()
+        idf = math.log(1 + total / documents)
+        matches |= condition
+        weights.append(When(condition, then=F('count') * Value(idf)))
+        required['matched_%s' % number] = Max(Case(
+            When(condition, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+    scored = SearchTerm.objects.filter(matches).values('post').annotate(
+        score=Sum(Case(*weights, output_field=FloatField())),
+        **required
+    ).filter(**{name: 1 for name in required})
+    rank = scored.filter(post=OuterRef('pk')).values('score')
+    return Post.objects.filter(
+        pk__in=scored.values('post'),
+    ).annotate(
+        rank=Subquery(rank, output_field=FloatField()),
+    ).order_by('-rank', '-created', '-id')
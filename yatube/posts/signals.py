@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import (FEED_GROUP, author_posts_changed, change_counts,
+                       feed_count_key, feed_keys, follows_changed)
+from . import search, timeline
+from .caching import invalidate_feeds
+from .comments import invalidate_first_page
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+# Поля автора, которые выводятся в карточке поста.
+CARD_AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+# Поля группы, которые выводятся в карточке и на странице поста.
+CARD_GROUP_FIELDS = {'title', 'slug'}
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запомнить прежние группу и текст поста до редактирования."""
+    if instance.pk is None:
+        return
+    previous = Post.objects.filter(
+        pk=instance.pk,
+    ).values_list('group_id', 'text').first()
+    if previous is not None:
+        instance._previous_group_id, instance._previous_text = previous
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    invalidate_feeds()
+    if created:
+        change_counts(feed_keys(instance), 1)
+        author_posts_changed(instance.author_id)
+        AuthorStats.objects.change(instance.author_id, posts_count=1)
+        timeline.push_post(instance)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        if previous_group_id:
+            change_counts(
+                [feed_count_key(FEED_GROUP, previous_group_id)], -1
+            )
+        if instance.group_id:
+            change_counts(
+                [feed_count_key(FEED_GROUP, instance.group_id)], 1
+            )
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_previous_text', None) != instance.text:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    invalidate_feeds()
+    change_counts(feed_keys(instance), -1)
+    author_posts_changed(instance.author_id)
+    AuthorStats.objects.change(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_follower_count(sender, instance, **kwargs):
+    follows_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.change(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    AuthorStats.objects.change(instance.author_id, followers_count=-1)
+    timeline.prune(instance.user, instance.author)
+    timeline.refill(instance.author)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.change(instance.author_id, comments_count=1)
+        invalidate_feeds()
+        invalidate_first_page(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    AuthorStats.objects.change(instance.author_id, comments_count=-1)
+    invalidate_first_page(instance.post_id)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_name(sender, instance, update_fields=None, **kwargs):
+    instance._previous_name = None
+    if instance.pk is None:
+        return
+    if update_fields and not CARD_AUTHOR_FIELDS & set(update_fields):
+        return
+    instance._previous_name = User.objects.filter(
+        pk=instance.pk,
+    ).values_list(*sorted(CARD_AUTHOR_FIELDS)).first()
+
+
+@receiver(post_save, sender=User)
+def touch_author_posts(sender, instance, created, **kwargs):
+    """Сменилось имя автора — обновить версию его постов."""
+    previous_name = instance._previous_name
+    if created or previous_name is None:
+        return
+    name = tuple(
+        getattr(instance, field) for field in sorted(CARD_AUTHOR_FIELDS)
+    )
+    if name != previous_name:
+        Post.objects.filter(author=instance).update(modified=timezone.now())
+        invalidate_feeds()
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_name(sender, instance, **kwargs):
+    instance._previous_name = None
+    if instance.pk is None:
+        return
+    instance._previous_name = Group.objects.filter(
+        pk=instance.pk,
+    ).values_list(*sorted(CARD_GROUP_FIELDS)).first()
+
+
+@receiver(post_save, sender=Group)
+def touch_group_posts(sender, instance, created, **kwargs):
+    """Сменились название или адрес группы — обновить версию её постов."""
+    previous_name = instance._previous_name
+    if created or previous_name is None:
+        return
+    name = tuple(
+        getattr(instance, field) for field in sorted(CARD_GROUP_FIELDS)
+    )
+    if name != previous_name:
+        Post.objects.filter(group=instance).update(modified=timezone.now())
+        invalidate_feeds()
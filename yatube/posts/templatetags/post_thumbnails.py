@@ -0,0 +1,11 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, preset):
+    """Готовая миниатюра картинки поста или None, пока её нет."""
+    return thumbnails.post_thumbnail(post, preset)
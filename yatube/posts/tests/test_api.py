@@ -0,0 +1,102 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.api import API_PAGE_SIZE
+from posts.models import Group, Post
+
+User = get_user_model()
+TOTAL = API_PAGE_SIZE + 5
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой',
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        for number in range(TOTAL):
+            Post.objects.create(
+                text='Пост %s' % number, author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:api_index')
+
+    def test_cursor_pages(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b', "', response.content)
+        data = response.json()
+        self.assertEqual(data['count'], TOTAL)
+        self.assertIsNone(data['previous'])
+        first = data['results'][0]
+        self.assertEqual(first['text'], 'Пост %s' % (TOTAL - 1))
+        self.assertEqual(first['author_name'], 'Лев Толстой')
+        seen = [post['id'] for post in data['results']]
+        data = self.client.get(data['next']).json()
+        seen += [post['id'] for post in data['results']]
+        self.assertIsNone(data['next'])
+        self.assertEqual(
+            seen,
+            list(Post.objects.order_by('-created', '-id')
+                 .values_list('pk', flat=True)),
+        )
+
+    def test_group_and_profile(self):
+        pages = {
+            reverse('posts:api_group', args=('group',)): TOTAL // 2,
+            reverse('posts:api_profile', args=('author',)): TOTAL,
+        }
+        for url, count in pages.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).json()['count'], count)
+        for url in (
+            reverse('posts:api_group', args=('missing',)),
+            reverse('posts:api_profile', args=('missing',)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_not_modified_before_rows(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('MAX(', queries[0]['sql'])
+
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        post = Post.objects.earliest('created')
+        post.text = 'Исправлено'
+        post.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        Post.objects.latest('created').delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['count'], TOTAL - 1)
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cards import CARD_TEMPLATE, attach_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author',
+            first_name='Лев',
+            last_name='Толстой',
+        )
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание',
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:group_list', args=[self.group.slug])
+
+    def test_cards_rendered_once(self):
+        """Повторная страница собирается из кэша без шаблона карточки."""
+        response = Client().get(self.url)
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
+        self.assertContains(response, 'Текст поста')
+        response = Client().get(self.url)
+        self.assertTemplateNotUsed(response, CARD_TEMPLATE)
+        self.assertContains(response, 'Текст поста')
+
+    def test_post_edit_invalidates_card(self):
+        attach_cards([self.post])
+        self.post.text = 'Новый текст'
+        self.post.save()
+        post, = attach_cards(Post.objects.filter(pk=self.post.pk))
+        self.assertIn('Новый текст', post.card)
+
+    def test_author_rename_invalidates_card(self):
+        attach_cards(Post.objects.filter(pk=self.post.pk))
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        post, = attach_cards(Post.objects.filter(pk=self.post.pk))
+        self.assertIn('Алексей Толстой', post.card)
+
+    def test_last_login_keeps_card(self):
+        modified = Post.objects.get(pk=self.post.pk).modified
+        self.client.force_login(self.author)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).modified, modified)
@@ -0,0 +1,92 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.comments import COMMENTS_PER_PAGE
+from posts.models import Comment, Post
+
+User = get_user_model()
+TOTAL = COMMENTS_PER_PAGE * 2 + 5
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        now = timezone.now()
+        comments = Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text='Коммент %s' % n)
+            for n in range(TOTAL)
+        )
+        # Одинаковое время у части комментариев проверяет ключ (created, id).
+        for number, comment in enumerate(comments):
+            Comment.objects.filter(text=comment.text).update(
+                created=now - timedelta(minutes=number // 3),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk},
+        )
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_pages_cover_thread_once(self):
+        response = self.client.get(self.detail_url)
+        seen = self.texts(response.context['comments'])
+        self.assertEqual(len(seen), COMMENTS_PER_PAGE)
+        next_url = response.context['next_comments']
+        while next_url:
+            with self.assertNumQueries(1):
+                data = self.client.get(
+                    next_url, HTTP_ACCEPT='application/json',
+                ).json()
+            page = re.findall(r'Коммент \d+', data['html'])
+            self.assertEqual(
+                len(page), min(COMMENTS_PER_PAGE, TOTAL - len(seen)),
+            )
+            seen += page
+            next_url = data['next']
+        expected = self.texts(
+            Comment.objects.filter(post=self.post).order_by('-created', '-id')
+        )
+        self.assertEqual(seen, expected)
+
+    def test_fragment_without_json(self):
+        response = self.client.get(
+            self.client.get(self.detail_url).context['next_comments']
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, 'data-load-comments')
+
+    def test_first_page_cached_until_new_comment(self):
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(3):
+            self.client.get(self.detail_url)
+        reader = User.objects.create_user(username='reader')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Свежий комментарий'},
+        )
+        response = self.client.get(self.detail_url)
+        self.assertEqual(
+            response.context['comments'][0].text, 'Свежий комментарий',
+        )
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6}),
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'detail': reverse('posts:post_detail', args=(self.post.pk,)),
+        }
+
+    def etag(self, url, client=None):
+        return (client or self.guest_client).get(url)['ETag']
+
+    def revalidate(self, url, etag):
+        return self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_with_one_query(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(url)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertFalse(response.has_header('Last-Modified'))
+                with self.assertNumQueries(1):
+                    response = self.revalidate(url, response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_make_new_version(self):
+        etags = {name: self.etag(url) for name, url in self.urls.items()}
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий',
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.revalidate(self.urls['detail'], etags['detail']).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.revalidate(
+                self.urls['profile'], etags['profile'],
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.revalidate(self.urls['group'], etags['group']).status_code,
+            304,
+        )
+        Group.objects.filter(pk=self.group.pk).update(title='Новое имя')
+        self.assertEqual(
+            self.revalidate(self.urls['group'], etags['group']).status_code,
+            200,
+        )
+        etag = self.etag(self.urls['index'])
+        Post.objects.create(text='Второй', author=self.author)
+        Post.objects.get(text='Второй').delete()
+        self.assertEqual(
+            self.revalidate(self.urls['index'], etag).status_code, 200,
+        )
+
+    def test_group_rename_makes_new_version(self):
+        """Новое название группы не отдаётся из 304 со старым."""
+        etags = {name: self.etag(url) for name, url in self.urls.items()}
+        self.group.title = 'Новое имя'
+        self.group.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.revalidate(url, etags[name])
+                self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            self.guest_client.get(self.urls['detail']), 'Новое имя',
+        )
+
+    def test_version_depends_on_user(self):
+        client = Client()
+        client.force_login(self.reader)
+        self.assertNotEqual(
+            self.etag(self.urls['detail']),
+            self.etag(self.urls['detail'], client),
+        )
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('posts:group_list', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:post_detail', args=(10 ** 6,)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_if_modified_since_alone_renders_page(self):
+        """Время не вся версия: без ETag страница отдаётся целиком."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+                )
+                self.assertEqual(response.status_code, 200)
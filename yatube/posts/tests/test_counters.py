@@ -0,0 +1,148 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counters
+from posts.counters import (FEED_ALL, FEED_FOLLOWER, FEED_GROUP, FeedCounter,
+                            FollowFeedCounter, feed_count_key,
+                            table_row_estimate)
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(text='Пост %s' % number, author=cls.author, group=cls.group)
+            for number in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return {
+            feed: counter.get(posts)
+            for feed, counter, posts in (
+                (FEED_ALL, FeedCounter(FEED_ALL), Post.objects.all()),
+                (FEED_GROUP, FeedCounter(FEED_GROUP, self.group.pk),
+                 self.group.post_set.all()),
+                (FEED_FOLLOWER, FollowFeedCounter(self.reader.pk),
+                 Post.objects.filter(author__following__user=self.reader)),
+            )
+        }
+
+    def test_counter_cached(self):
+        """Повторное чтение счётчика не обращается к базе."""
+        counter = FeedCounter(FEED_ALL)
+        self.assertEqual(counter.get(Post.objects.all()), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(counter.get(Post.objects.all()), 3)
+
+    def test_counters_follow_post_changes(self):
+        """Сигналы Post поддерживают счётчики всех лент."""
+        self.counts()
+        post = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group,
+        )
+        self.assertEqual(self.counts(), {
+            FEED_ALL: 4, FEED_GROUP: 4, FEED_FOLLOWER: 4,
+        })
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counts()[FEED_GROUP], 3)
+        self.assertEqual(
+            cache.get(feed_count_key(FEED_GROUP, self.other_group.pk)), None
+        )
+        post.delete()
+        self.assertEqual(self.counts(), {
+            FEED_ALL: 3, FEED_GROUP: 3, FEED_FOLLOWER: 3,
+        })
+
+    def test_follow_resets_follower_counter(self):
+        self.counts()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.counts()[FEED_FOLLOWER], 0)
+
+    def test_follower_counter_cached(self):
+        self.counts()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts()[FEED_FOLLOWER], 3)
+
+    def test_other_author_post_keeps_follower_counter(self):
+        """Пост автора, на которого не подписан, не сбрасывает счётчик."""
+        other = User.objects.create_user(username='other')
+        self.counts()
+        Post.objects.create(text='Чужой пост', author=other)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts()[FEED_FOLLOWER], 3)
+        Follow.objects.create(user=self.reader, author=other)
+        self.assertEqual(self.counts()[FEED_FOLLOWER], 4)
+
+    def test_post_saved_while_counting_is_recounted(self):
+        """Пост, сохранённый во время COUNT, не теряется в счётчике."""
+        counter = FeedCounter(FEED_ALL)
+        posts = Post.objects.all()
+        count = posts.count
+
+        def count_and_save():
+            result = count()
+            Post.objects.create(text='Новый пост', author=self.author)
+            return result
+
+        with mock.patch.object(posts, 'count', count_and_save):
+            self.assertEqual(counter.get(posts), 3)
+        self.assertEqual(counter.get(Post.objects.all()), 4)
+
+    def test_numbered_page_uses_counter(self):
+        cache.set(feed_count_key(FEED_GROUP, self.group.pk), 42)
+        response = Client().get(
+            reverse('posts:group_list', args=[self.group.slug]),
+            {'page': 1},
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 42)
+
+    @mock.patch.object(counters, 'table_row_estimate', return_value=1000)
+    def test_approximate_miss_caches_exact_count(self, estimate):
+        """На промахе точное число считается и дальше сдвигается сигналами."""
+        counter = FeedCounter(FEED_ALL, approximate=True)
+        self.assertEqual(counter.get(Post.objects.all()), 3)
+        estimate.assert_not_called()
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(cache.get(feed_count_key(FEED_ALL)), 4)
+
+    @mock.patch.object(counters, 'table_row_estimate', return_value=1000)
+    def test_approximate_estimate_while_counting(self, estimate):
+        """Пока другой воркер считает, отдаётся оценка."""
+        cache.add('rebuild:%s' % feed_count_key(FEED_ALL), 1)
+        counter = FeedCounter(FEED_ALL, approximate=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(counter.get(Post.objects.all()), 1000)
+
+    def test_estimate_reads_routed_database(self):
+        """Оценка читается из базы, которую выбирает роутер."""
+        connection = mock.MagicMock(vendor='sqlite')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = ('7 1',)
+        with mock.patch.object(
+            counters.router, 'db_for_read', return_value='replica',
+        ), mock.patch.object(counters, 'connections', {'replica': connection}):
+            self.assertEqual(table_row_estimate(Post), 7)
@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        cls.in_group = Post.objects.create(
+            text='Пост в группе', author=cls.author, group=cls.group,
+        )
+        cls.other = Post.objects.create(text='Пост', author=cls.reader)
+        Comment.objects.create(
+            post=cls.in_group, author=cls.reader, text='Комментарий',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_staff_only(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_ndjson_with_filters(self):
+        """NDJSON по строке на пост, фильтр по группе и автору."""
+        response, content = self.get(group='group')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], self.in_group.pk)
+        self.assertEqual(rows[0]['author'], 'author')
+        self.assertEqual(rows[0]['group'], 'group')
+        _, content = self.get(author='reader')
+        self.assertEqual(json.loads(content)['id'], self.other.pk)
+        _, content = self.get(since='2000-01-01', until='2000-12-31')
+        self.assertEqual(content, b'')
+
+    def test_csv_gzip(self):
+        response, content = self.get(model='comments', format='csv', gzip=1)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('comments.csv.gz', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(content).decode())))
+        self.assertEqual(rows[0], ['id', 'created', 'post', 'author', 'text'])
+        self.assertEqual(rows[1][2:], [str(self.in_group.pk), 'reader',
+                                       'Комментарий'])
+
+    def test_invalid_parameters(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('posts:export'), {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'follows.ndjson')
+            call_command('export_posts', model='follows', output=path)
+            with open(path, encoding='utf-8') as output:
+                row, = [json.loads(line) for line in output]
+        self.assertEqual(row['user'], 'reader')
+        self.assertEqual(row['author'], 'author')
@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import timeline
+from posts.imports import Lookup
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+from posts.search import search_posts
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.source, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        output = StringIO()
+        call_command('import_posts', path, stdout=output, **options)
+        return output.getvalue()
+
+    def test_import_posts(self):
+        """Посты создаются пачками, ошибочные строки пропускаются."""
+        with open(os.path.join(self.source, 'cat.gif'), 'wb') as image:
+            image.write(SMALL_GIF)
+        rows = [
+            {'author': 'author', 'group': 'group', 'text': 'Импортные кошки',
+             'created': '2020-01-02T03:04:05', 'image': 'cat.gif'},
+            {'author': 'author', 'text': 'Второй пост'},
+            {'author': 'nobody', 'text': 'Без автора'},
+            {'author': 'author', 'text': ''},
+            {'author': 'author', 'group': 'missing', 'text': 'Нет группы'},
+        ]
+        path = self.write(
+            'posts.ndjson', '\n'.join(json.dumps(row) for row in rows),
+        )
+        report = self.run_import(
+            path, images_dir=self.source, batch_size=2,
+        )
+        self.assertIn('Создано записей: 2', report)
+        self.assertIn('Пропущено строк: 3', report)
+        self.assertIn("строка 3: нет автора 'nobody'", report)
+        self.assertIn('записей/с', report)
+
+        post = Post.objects.get(text='Импортные кошки')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.created.year, 2020)
+        self.assertTrue(post.image.name.startswith('posts/cat'))
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual(list(search_posts('кошка')), [post])
+        self.assertEqual(AuthorStats.objects.get(author=self.author)
+                         .posts_count, 2)
+        self.assertTrue(self.reader.timeline.filter(post=post).exists())
+
+    def test_import_rejects_non_images(self):
+        """Картинка проверяется так же, как при загрузке через форму."""
+        with open(os.path.join(self.source, 'fake.gif'), 'wb') as image:
+            image.write(b'not an image')
+        path = self.write('posts.ndjson', json.dumps({
+            'author': 'author', 'text': 'Не картинка', 'image': 'fake.gif',
+        }))
+        report = self.run_import(path, images_dir=self.source)
+        self.assertIn('Создано записей: 0', report)
+        self.assertIn('строка 1: картинка:', report)
+        self.assertFalse(Post.objects.filter(text='Не картинка').exists())
+
+    def test_import_schedules_thumbnails(self):
+        with open(os.path.join(self.source, 'cat.gif'), 'wb') as image:
+            image.write(SMALL_GIF)
+        rows = [
+            {'author': 'author', 'text': 'С картинкой', 'image': 'cat.gif'},
+            {'author': 'author', 'text': 'Без картинки'},
+        ]
+        path = self.write(
+            'posts.ndjson', '\n'.join(json.dumps(row) for row in rows),
+        )
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            self.run_import(path, images_dir=self.source)
+        post, = [call.args[0] for call in schedule.call_args_list]
+        self.assertEqual(post.pk, Post.objects.get(text='С картинкой').pk)
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 0)
+    def test_import_popular_author_read_on_request(self):
+        """Посты популярного автора не раскладываются, подписка неполна."""
+        path = self.write('posts.ndjson', json.dumps({
+            'author': 'author', 'text': 'Популярный пост',
+        }))
+        self.run_import(path)
+        self.assertFalse(self.reader.timeline.exists())
+        self.assertFalse(Follow.objects.get(
+            user=self.reader, author=self.author,
+        ).timeline_complete)
+
+    def test_import_comments_csv(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        path = self.write(
+            'comments.csv',
+            'post,author,text\n'
+            '%s,reader,Первый\n'
+            '999999,reader,Нет поста\n' % post.pk,
+        )
+        report = self.run_import(path, model='comments')
+        self.assertIn('Создано записей: 1', report)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post, post)
+        self.assertEqual(comment.author, self.reader)
+
+    def test_lookup_one_query_per_batch(self):
+        lookup = Lookup(User.objects.all(), 'username')
+        with self.assertNumQueries(1):
+            lookup.load(['author', 'reader', 'nobody', 'author'])
+        with self.assertNumQueries(0):
+            lookup.load(['author', 'nobody'])
+        self.assertEqual(lookup.get('author'), self.author.pk)
+        self.assertIsNone(lookup.get('nobody'))
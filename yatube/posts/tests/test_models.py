@@ -1,7 +1,10 @@
-from django.test import TestCase
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
 
-from posts.models import Post, Group
+from posts.models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -86,3 +89,53 @@ class PostModelsTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     group._meta.get_field(field).help_text, expected_value)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def current(self):
+        return AuthorStats.objects.for_author(self.author)
+
+    def test_stats_created_on_read(self):
+        """Запись статистики создаётся из базы при первом чтении."""
+        stats = self.current()
+        self.assertEqual(
+            (stats.posts_count, stats.comments_count, stats.followers_count),
+            (1, 0, 0),
+        )
+        with self.assertNumQueries(1):
+            self.current()
+
+    def test_signals_keep_stats(self):
+        """Сигналы Post, Comment и Follow поддерживают счётчики."""
+        self.current()
+        post = Post.objects.create(text='Ещё пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий',
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        stats = self.current()
+        self.assertEqual(
+            (stats.posts_count, stats.comments_count, stats.followers_count),
+            (2, 1, 1),
+        )
+        comment.delete()
+        follow.delete()
+        post.delete()
+        stats = self.current()
+        self.assertEqual(
+            (stats.posts_count, stats.comments_count, stats.followers_count),
+            (1, 0, 0),
+        )
+
+    def test_rebuild_command(self):
+        self.current()
+        AuthorStats.objects.update(posts_count=100)
+        call_command('rebuild_author_stats', stdout=StringIO())
+        self.assertEqual(self.current().posts_count, 1)
+        self.assertEqual(AuthorStats.objects.count(), User.objects.count())
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+from posts.paginators import CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text='Пост %s' % number, author=cls.user)
+            for number in range(25)
+        )
+        # Одинаковое время создания: порядок держится только на id.
+        Post.objects.update(created=timezone.now())
+        cls.ordered = list(Post.objects.order_by('-created', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_walk_forward_and_back(self):
+        """Курсоры обходят ленту без пропусков и повторов."""
+        seen = []
+        cursor = None
+        pages = []
+        while True:
+            paginator = CursorPaginator(Post.objects.all(), 10)
+            page = paginator.page(cursor)
+            pages.append(page)
+            seen.extend(page.object_list)
+            if not page.has_next():
+                break
+            cursor = paginator.next_cursor
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+        last = pages[-1].paginator
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.page(last.previous_cursor)
+        self.assertEqual(list(page), self.ordered[10:20])
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_first_page_single_query(self):
+        """Первая страница читается одним запросом без COUNT(*)."""
+        with self.assertNumQueries(1):
+            page = CursorPaginator(Post.objects.all(), 10).page()
+            self.assertTrue(page.has_next())
+
+    def test_broken_cursor_returns_first_page(self):
+        page = CursorPaginator(Post.objects.all(), 10).get_page('broken')
+        self.assertEqual(list(page), self.ordered[:10])
+
+    def test_view_links(self):
+        """Лента отдаёт курсор, нумерация включается через `?page=`."""
+        client = Client()
+        response = client.get(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertIsInstance(paginator, CursorPaginator)
+        self.assertContains(response, '?cursor=%s' % paginator.next_cursor)
+
+        response = client.get(
+            reverse('posts:profile', args=[self.user.username]),
+            {'page': 3},
+        )
+        page_obj = response.context['page_obj']
+        self.assertNotIsInstance(page_obj.paginator, CursorPaginator)
+        self.assertEqual(len(page_obj), 5)
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueriesTests(TestCase):
+    """Число запросов страниц не зависит от числа постов и комментариев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой',
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            post = Post.objects.create(
+                text='Пост %s' % number, author=cls.author, group=cls.group,
+            )
+        for number in range(5):
+            commenter = User.objects.create_user(username='user%s' % number)
+            Comment.objects.create(
+                post=post, author=commenter, text='Комментарий',
+            )
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_queries_per_view(self):
+        """Страницы укладываются в фиксированное число запросов."""
+        # Сессия и пользователь — два запроса на каждой странице; ещё
+        # один у всех, кроме follow_index, — версия для ETag.
+        pages = (
+            (reverse('posts:index'), 4),
+            (reverse('posts:group_list', args=(self.group.slug,)), 5),
+            (reverse('posts:profile', args=(self.author.username,)), 7),
+            (reverse('posts:follow_index'), 4),
+            (reverse('posts:post_detail', args=(self.post.pk,)), 6),
+        )
+        for url, queries in pages:
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                self.client.get(url)
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, SearchTerm
+from posts.search import search_posts, stem
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            text='Кошки любят спать. Кошка спит весь день.',
+            author=cls.user,
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки любят гулять, а кошки спят.',
+            author=cls.user,
+        )
+        cls.code = Post.objects.create(
+            text='Программирование на Python', author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stemming(self):
+        """Разные формы слова приводятся к одной основе."""
+        self.assertEqual(stem('кошки'), stem('кошка'))
+        self.assertEqual(stem('любят'), stem('любить'))
+        self.assertEqual(stem('Ёлки'), stem('елка'))
+
+    def test_ranking_and_all_terms(self):
+        """Ищутся посты со всеми словами, чаще встречающие — выше."""
+        self.assertEqual(list(search_posts('кошкой')), [self.cats, self.dogs])
+        self.assertEqual(list(search_posts('кошки гуляют')), [self.dogs])
+        self.assertEqual(list(search_posts('кошки слоны')), [])
+        self.assertEqual(list(search_posts('')), [])
+
+    def test_prefix_query(self):
+        self.assertEqual(list(search_posts('програм*')), [self.code])
+        self.assertEqual(list(search_posts('pyth*')), [self.code])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при редактировании и удалении поста."""
+        post = Post.objects.get(pk=self.code.pk)
+        post.text = 'Кошки и программирование'
+        post.save()
+        self.assertIn(post, search_posts('кошки'))
+        self.assertEqual(list(search_posts('python')), [])
+        post.delete()
+        self.assertFalse(SearchTerm.objects.filter(post_id=self.code.pk))
+
+    def test_rebuild_command(self):
+        SearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(search_posts('гулять')), [self.dogs])
+
+    def test_search_page(self):
+        """Страница поиска выводит карточки и сохраняет запрос в ссылках."""
+        for number in range(11):
+            Post.objects.create(text='Кошка %s' % number, author=self.user)
+        response = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertEqual(response.context['page_obj'][0], self.cats)
+        self.assertContains(response, 'href="?q=%D0%BA%D0%BE%D1%88%D0%BA')
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass',
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собака'},
+        )
+        self.assertEqual(
+            list(response.context['cl'].queryset), [self.dogs],
+        )
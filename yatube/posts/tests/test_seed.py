@@ -0,0 +1,69 @@
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, **options):
+        options = dict({
+            'users': 50, 'groups': 5, 'posts': 600, 'comments': 300,
+            'follows': 200, 'images': 2, 'stdout': StringIO(),
+        }, **options)
+        call_command('seed_yatube', **options)
+
+    def authors(self):
+        return Counter(Post.objects.values_list(
+            'author__username', flat=True,
+        ))
+
+    def test_seed_creates_skewed_data(self):
+        """Команда создаёт данные с перекосом в сторону популярных авторов."""
+        self.seed()
+        self.assertEqual(Post.objects.count(), 600)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertTrue(0 < Follow.objects.count() <= 200)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        counts = sorted(self.authors().values(), reverse=True)
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            600,
+        )
+        dates = Post.objects.values_list('created', flat=True)
+        self.assertGreater(len(set(dates)), 1)
+
+    def test_seed_fills_timelines(self):
+        """Посты авторов разложены по лентам подписчиков."""
+        self.seed(images=0)
+        self.assertFalse(
+            Follow.objects.filter(timeline_complete=False).exists()
+        )
+        follow = Follow.objects.filter(author__posts__isnull=False).first()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=follow.user, author=follow.author,
+        ).exists())
+
+    def test_seed_is_reproducible(self):
+        """Один и тот же seed даёт одинаковые данные."""
+        self.seed(images=0)
+        first = self.authors()
+        Post.objects.all().delete()
+        self.seed(images=0)
+        self.assertEqual(self.authors(), first)
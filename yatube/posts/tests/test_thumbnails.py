@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='thumb.gif', content=SMALL_GIF, content_type='image/gif',
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_original_image_until_thumbnail_ready(self):
+        """Пока миниатюры нет, выводится исходная картинка."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertIsNone(thumbnails.ready_thumbnail(self.post.image, 'card'))
+        self.assertContains(self.client.get(url), self.post.image.url)
+
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.ready_thumbnail(self.post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_generate_bumps_post_version(self):
+        """После нарезки карточки поста пересобираются."""
+        modified = self.post.modified
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.modified, modified)
+
+    def test_page_thumbnails_in_one_lookup(self):
+        """Миниатюры всей страницы ищутся одним запросом."""
+        thumbnails.generate(self.post.image.name)
+        posts = [
+            Post(pk=self.post.pk, image=self.post.image.name),
+            Post(pk=self.post.pk, image='posts/missing.gif'),
+            Post(),
+        ]
+        with self.assertNumQueries(1):
+            thumbnails.attach_thumbnails(posts)
+        with self.assertNumQueries(0):
+            thumbnails.attach_thumbnails(posts)
+        self.assertEqual(
+            posts[0].thumbnails['card'].url,
+            thumbnails.ready_thumbnail(self.post.image, 'card').url,
+        )
+        self.assertIsNone(posts[1].thumbnails['card'])
+        self.assertIsNone(posts[2].thumbnails['card'])
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_post_create_schedules_generation(self):
+        """Создание поста ставит нарезку миниатюр в очередь."""
+        self.client.force_login(self.user)
+        # TestCase не фиксирует транзакцию: on_commit выполняем сразу.
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func(),
+        ), mock.patch.object(thumbnails, 'get_executor') as executor:
+            self.client.post(reverse('posts:post_create'), data={
+                'text': 'Новый пост',
+                'image': SimpleUploadedFile(
+                    name='new.gif', content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            })
+        executor.return_value.submit.assert_called_once_with(
+            thumbnails.generate_in_worker, 'posts/new.gif',
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_post_edit_schedules_only_new_image(self):
+        """Правка текста не ставит нарезку, новая картинка — ставит."""
+        self.client.force_login(self.user)
+        url = reverse('posts:post_edit', args=(self.post.pk,))
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func(),
+        ), mock.patch.object(thumbnails, 'get_executor') as executor:
+            self.client.post(url, data={'text': 'Новый текст'})
+            executor.return_value.submit.assert_not_called()
+            self.client.post(url, data={
+                'text': 'Новый текст',
+                'image': SimpleUploadedFile(
+                    name='edited.gif', content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            })
+        executor.return_value.submit.assert_called_once_with(
+            thumbnails.generate_in_worker, 'posts/edited.gif',
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_no_workers_generates_after_commit(self):
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func(),
+        ), mock.patch.object(thumbnails, 'generate') as generate:
+            thumbnails.schedule(self.post)
+        generate.assert_called_once_with(self.post.image.name)
+
+    def test_generate_keeps_caller_connection(self):
+        """Синхронный вызов не закрывает соединение вызывающего."""
+        with mock.patch.object(thumbnails.connections, 'close_all') as close:
+            thumbnails.generate(self.post.image.name)
+            close.assert_not_called()
+            thumbnails.generate_in_worker(self.post.image.name)
+        close.assert_called_once_with()
@@ -0,0 +1,172 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other_author = User.objects.create_user(username='other_author')
+
+    def paginator(self, per_page):
+        return timeline.TimelinePaginator(
+            timeline.follow_feed(self.reader), per_page, user=self.reader,
+        )
+
+    def feed(self, per_page=2):
+        """Лента страницами вперёд; обратный проход даёт те же страницы."""
+        pages = []
+        cursor = None
+        while True:
+            paginator = self.paginator(per_page)
+            pages.append(list(paginator.page(cursor)))
+            cursor = paginator.next_cursor
+            if cursor is None:
+                break
+        for page in reversed(pages[:-1]):
+            cursor = paginator.previous_cursor
+            paginator = self.paginator(per_page)
+            self.assertEqual(list(paginator.page(cursor)), page)
+        return [post for page in pages for post in page]
+
+    def create_posts(self, author, count):
+        return [
+            Post.objects.create(text='Пост %s' % number, author=author)
+            for number in range(count)
+        ]
+
+    def test_fan_out_backfill_and_prune(self):
+        """Посты попадают в ленту при публикации и подписке."""
+        old_post, = self.create_posts(self.author, 1)
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post, = self.create_posts(self.author, 1)
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        self.assertEqual(
+            set(entries.values_list('post', flat=True)),
+            {old_post.pk, new_post.pk},
+        )
+        self.assertEqual(self.feed(), [new_post, old_post])
+
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(entries.exists())
+        self.assertEqual(self.feed(), [])
+
+    @mock.patch.object(timeline, 'TIMELINE_SLACK', 0)
+    @mock.patch.object(timeline, 'TIMELINE_LENGTH', 3)
+    def test_capped_timeline_reads_history(self):
+        """Лента обрезается, старые посты читаются по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = self.create_posts(self.author, 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(self.feed(), posts[::-1])
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 1)
+    def test_popular_author_read_on_request(self):
+        """Посты популярного автора не раскладываются по лентам."""
+        Follow.objects.create(user=self.reader, author=self.other_author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other_author, author=self.author)
+        first, = self.create_posts(self.other_author, 1)
+        popular, = self.create_posts(self.author, 1)
+        last, = self.create_posts(self.other_author, 1)
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.author).exists()
+        )
+        self.assertEqual(self.feed(), [last, popular, first])
+
+    def test_bulk_created_rows_read_on_request(self):
+        """Подписка и посты из bulk_create не теряются в ленте."""
+        old_post, = self.create_posts(self.other_author, 1)
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.author),
+        ])
+        # SQLite не возвращает pk из bulk_create.
+        Post.objects.bulk_create([
+            Post(text='Пост из bulk_create', author=self.author),
+        ])
+        bulk_post = Post.objects.get(text='Пост из bulk_create')
+        Follow.objects.create(user=self.reader, author=self.other_author)
+        self.assertEqual(self.feed(), [bulk_post, old_post])
+
+        timeline.backfill(self.reader, self.author)
+        self.assertTrue(Follow.objects.get(
+            user=self.reader, author=self.author,
+        ).timeline_complete)
+        self.assertEqual(self.feed(), [bulk_post, old_post])
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 1)
+    def test_author_back_under_limit_refills(self):
+        """Автор снова раскладывается — пропущенные посты в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other_author, author=self.author)
+        popular, = self.create_posts(self.author, 1)
+        Follow.objects.create(user=self.reader, author=self.other_author)
+        last, = self.create_posts(self.other_author, 1)
+        self.assertEqual(self.feed(), [last, popular])
+
+        Follow.objects.filter(user=self.other_author).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=popular,
+        ).exists())
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, timeline_complete=False,
+        ).exists())
+        self.assertEqual(self.feed(), [last, popular])
+
+    def test_first_page_reads_timeline_only(self):
+        """Первая страница берётся из ленты без соединения с подписками."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = self.create_posts(self.author, 3)
+        with mock.patch.object(
+            timeline.TimelinePaginator, 'history_rows',
+        ) as history_rows:
+            page = self.paginator(2).page()
+        self.assertEqual(list(page), posts[:0:-1])
+        history_rows.assert_not_called()
+
+    def test_bulk_inserted_fills_complete_follows(self):
+        """После bulk_inserted посты из bulk_create есть в полной ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post, = self.create_posts(self.author, 1)
+        Post.objects.bulk_create([
+            Post(text='Пост из bulk_create', author=self.author),
+        ])
+        bulk_post = Post.objects.get(text='Пост из bulk_create')
+        timeline.bulk_inserted([self.author.pk])
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=bulk_post,
+        ).exists())
+        self.assertTrue(Follow.objects.get(
+            user=self.reader, author=self.author,
+        ).timeline_complete)
+        self.assertEqual(self.feed(), [bulk_post, post])
+
+    @mock.patch.object(timeline, 'TIMELINE_LENGTH', 2)
+    def test_fill_keeps_latest_posts(self):
+        """fill кладёт в ленту последние посты всех авторов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other_author)
+        first, = self.create_posts(self.author, 1)
+        second, = self.create_posts(self.other_author, 1)
+        third, = self.create_posts(self.author, 1)
+        TimelineEntry.objects.all().delete()
+        Follow.objects.update(timeline_complete=False)
+        timeline.fill([self.reader.pk])
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('post', flat=True)),
+            {second.pk, third.pk},
+        )
+        self.assertFalse(Follow.objects.filter(
+            timeline_complete=False,
+        ).exists())
+        self.assertEqual(self.feed(), [third, second, first])
@@ -334,6 +334,28 @@ class PostViewsTests(TestCase):
         self.assertEqual(new_follow.user, self.other_author)
         self.assertEqual(new_follow.author, self.user)
 
+    def test_follow_twice(self, *args, **kwargs):
+        """Повторная подписка не создаёт дубликат."""
+        url = reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.other_author.username},
+        )
+        response = self.author_client.get(url)
+        self.assertRedirects(
+            response,
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.other_author.username},
+            ),
+        )
+        self.assertEqual(
+            Follow.objects.filter(
+                user=self.user,
+                author=self.other_author,
+            ).count(),
+            1,
+        )
+
     def test_remove_follow(self, *args, **kwargs):
         count = Follow.objects.all().count()
         self.author_client.get(
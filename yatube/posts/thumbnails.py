@@ -0,0 +1,187 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+Шаблоны не режут картинки во время запроса: они берут готовую
+миниатюру из хранилища sorl-thumbnail, а пока её нет, показывают
+исходную картинку. Миниатюры готовит пул потоков после сохранения поста.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.cache import rebuild_lock
+from core.metrics import registry
+from core.replicas import read_primary
+
+from .caching import invalidate_feeds
+from .models import Post
+
+logger = logging.getLogger(__name__)
+generation_time = registry.histogram(
+    'yatube_thumbnail_seconds', 'Время нарезки миниатюр одной картинки.',
+)
+
+# Все размеры, которые выводят шаблоны: имя -> (геометрия, параметры).
+THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """Backend sorl-thumbnail, умеющий искать миниатюру без генерации."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        # Те же параметры, что собирает ThumbnailBackend.get_thumbnail:
+        # от них зависит имя файла миниатюры.
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def lookup(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None."""
+        thumbnail = self.thumbnail_file(file_, geometry_string, **options)
+        # Хранилище кэширует и отсутствие миниатюры: читаем с основной.
+        with read_primary():
+            return default.kvstore.get(thumbnail)
+
+    def lookup_many(self, files, geometry_string, **options):
+        """
+        Готовые миниатюры нескольких картинок: {картинка: миниатюра или None}.
+
+        Хранилище cached_db читается одним `get_many` из кэша и одним
+        запросом к базе для промахов вместо обращения на каждую картинку.
+        """
+        thumbnails = {
+            file_: self.thumbnail_file(file_, geometry_string, **options)
+            for file_ in files
+        }
+        kvstore = default.kvstore
+        if not isinstance(kvstore, KVStore):
+            with read_primary():
+                return {
+                    file_: kvstore.get(thumbnail)
+                    for file_, thumbnail in thumbnails.items()
+                }
+        keys = {
+            file_: add_prefix(thumbnail.key)
+            for file_, thumbnail in thumbnails.items()
+        }
+        values = kvstore.cache.get_many(set(keys.values()))
+        missing = set(keys.values()) - set(values)
+        if missing:
+            with read_primary():
+                found = dict(KVStoreModel.objects.filter(
+                    key__in=missing,
+                ).values_list('key', 'value'))
+            # Как и KVStore._get_raw, запоминаем и отсутствие миниатюры.
+            fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+            kvstore.cache.set_many(
+                fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+            )
+            values.update(fetched)
+        return {
+            file_: (
+                None if values[key] == EMPTY_VALUE
+                else deserialize_image_file(values[key])
+            )
+            for file_, key in keys.items()
+        }
+
+
+backend = PostThumbnailBackend()
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def ready_thumbnail(image, preset):
+    if not image:
+        return None
+    geometry, options = THUMBNAILS[preset]
+    return backend.lookup(image, geometry, **options)
+
+
+def attach_thumbnails(posts, preset='card'):
+    """Подставить миниатюры всех постов страницы в `post.thumbnails`."""
+    geometry, options = THUMBNAILS[preset]
+    names = {post.image.name for post in posts if post.image}
+    found = backend.lookup_many(names, geometry, **options) if names else {}
+    for post in posts:
+        thumbnails = getattr(post, 'thumbnails', {})
+        thumbnails[preset] = found.get(post.image.name)
+        post.thumbnails = thumbnails
+
+
+def post_thumbnail(post, preset):
+    """Миниатюра поста: подготовленная страницей или найденная отдельно."""
+    thumbnails = getattr(post, 'thumbnails', {})
+    if preset in thumbnails:
+        return thumbnails[preset]
+    return ready_thumbnail(post.image, preset)
+
+
+def generate(name):
+    """Подготовить все миниатюры картинки."""
+    try:
+        with rebuild_lock('thumbnail:%s' % name) as owner:
+            if not owner:
+                # Эту картинку уже режет другой воркер.
+                return
+            started = time.perf_counter()
+            for geometry, options in THUMBNAILS.values():
+                backend.get_thumbnail(name, geometry, **options)
+            generation_time.observe(time.perf_counter() - started)
+        # Карточки с исходной картинкой устарели.
+        Post.objects.filter(image=name).update(modified=timezone.now())
+        invalidate_feeds()
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+
+
+def generate_in_worker(name):
+    """`generate` в потоке пула: соединения потока закрываются после него."""
+    try:
+        generate(name)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Поставить миниатюры поста в очередь после фиксации транзакции."""
+    if not post.image:
+        return
+    name = post.image.name
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: generate(name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_in_worker, name)
+    )
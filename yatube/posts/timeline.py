@@ -0,0 +1,273 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается в ленты подписчиков автора. Ленты авторов
+с очень большим числом подписчиков не раскладываются: их посты
+подмешиваются при чтении. Длина ленты ограничена `TIMELINE_LENGTH`;
+всё, что старше самой старой записи, читается по подпискам.
+
+Из ленты читаются только авторы, чьи посты разложены полностью
+(`Follow.timeline_complete`): флаг ставят `backfill` и `fill`,
+снимает пропущенная раскладка. bulk_create сигналов не вызывает:
+после массовой записи постов нужно вызвать `bulk_inserted`, иначе
+новые посты не попадут в ленты.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from core.metrics import registry
+
+from .bulk import batches
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import NEXT, CursorPaginator
+
+TIMELINE_LENGTH = 500
+# Ленты обрезаются, когда перерастают лимит на столько записей.
+TIMELINE_SLACK = 50
+FANOUT_LIMIT = 1000
+# Больше авторов без полной ленты читаются одним запросом, а не
+# запросом на автора.
+ON_READ_QUERIES = 10
+
+# Последние посты всех раскладываемых авторов пользователя.
+FILL_SQL = """
+{insert} {entry} (user_id, post_id, author_id, created)
+SELECT follow.user_id, post.id, post.author_id, post.created
+FROM {post} post
+JOIN {follow} follow ON follow.author_id = post.author_id
+JOIN {stats} stats ON stats.author_id = post.author_id
+WHERE follow.user_id = %s AND stats.followers_count <= %s
+ORDER BY post.created DESC, post.id DESC
+LIMIT %s
+{suffix}
+"""
+
+fanout_size = registry.histogram(
+    'yatube_fanout_followers',
+    'Во сколько лент разложен новый пост.',
+    buckets=(0, 1, 10, 100, 500, 1000),
+)
+
+
+def is_fanned_out(author):
+    stats = AuthorStats.objects.for_author(author)
+    return stats.followers_count <= FANOUT_LIMIT
+
+
+def entries_for(user_ids, posts):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            created=post.created,
+        )
+        for user_id in user_ids
+        for post in posts
+    ]
+
+
+def trim(user_ids, slack=None):
+    """Оставить в лентах пользователей не больше TIMELINE_LENGTH записей."""
+    if slack is None:
+        slack = TIMELINE_SLACK
+    overflowing = TimelineEntry.objects.filter(
+        user_id__in=user_ids,
+    ).values('user').annotate(
+        total=Count('pk'),
+    ).filter(
+        total__gt=TIMELINE_LENGTH + slack,
+    ).values_list('user', flat=True)
+    for user_id in overflowing:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        boundary = entries.order_by('-created', '-pk').values_list(
+            'created', 'pk',
+        )[TIMELINE_LENGTH - 1]
+        created, pk = boundary
+        entries.filter(
+            Q(created__lt=created) | Q(created=created, pk__lt=pk)
+        ).delete()
+
+
+def push_post(post):
+    """Разложить новый пост по лентам подписчиков автора."""
+    if not is_fanned_out(post.author):
+        # Пост не попал в ленты: они больше не полны.
+        Follow.objects.filter(
+            author_id=post.author_id, timeline_complete=True,
+        ).update(timeline_complete=False)
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True))
+    fanout_size.observe(len(followers))
+    TimelineEntry.objects.bulk_create(
+        entries_for(followers, [post]), ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+def backfill(user, author):
+    """Добавить в ленту пользователя последние посты автора."""
+    if not is_fanned_out(author):
+        return
+    posts = Post.objects.filter(author=author).only(
+        'pk', 'author_id', 'created',
+    )[:TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        entries_for([user.pk], posts), ignore_conflicts=True,
+    )
+    trim([user.pk], slack=0)
+    Follow.objects.filter(user=user, author=author).update(
+        timeline_complete=True,
+    )
+
+
+def refill(author):
+    """Дополнить неполные ленты подписчиков автора, если он раскладывается."""
+    follows = Follow.objects.filter(author=author, timeline_complete=False)
+    if not follows.exists() or not is_fanned_out(author):
+        return
+    fill(list(follows.values_list('user', flat=True)))
+
+
+def fill(user_ids):
+    """
+    Дополнить ленты пользователей постами всех их авторов.
+
+    Один INSERT … SELECT на пользователя: последние TIMELINE_LENGTH
+    постов его раскладываемых авторов. Ленты обрезаются без запаса,
+    поэтому в них остаются последние посты этих авторов без пропусков,
+    и подписки на них отмечаются полными.
+    """
+    sql = FILL_SQL.format(
+        insert=connection.ops.insert_statement(ignore_conflicts=True),
+        suffix=connection.ops.ignore_conflicts_suffix_sql(
+            ignore_conflicts=True,
+        ),
+        entry=TimelineEntry._meta.db_table,
+        post=Post._meta.db_table,
+        follow=Follow._meta.db_table,
+        stats=AuthorStats._meta.db_table,
+    )
+    for batch in batches(user_ids):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for user_id in batch:
+                    cursor.execute(
+                        sql, [user_id, FANOUT_LIMIT, TIMELINE_LENGTH],
+                    )
+            trim(batch, slack=0)
+            Follow.objects.filter(
+                user_id__in=batch,
+                author__stats__followers_count__lte=FANOUT_LIMIT,
+            ).update(timeline_complete=True)
+
+
+def bulk_inserted(authors):
+    """
+    Разложить посты авторов, записанные bulk_create.
+
+    `authors` — id авторов или подзапрос с ними. Статистика авторов
+    должна быть уже пересчитана: по ней видно, кто «популярен».
+    """
+    Follow.objects.filter(
+        author__in=authors, timeline_complete=True,
+    ).update(timeline_complete=False)
+    fill(list(Follow.objects.filter(
+        author__in=authors,
+    ).values_list('user', flat=True).distinct()))
+
+
+def prune(user, author):
+    """Убрать из ленты пользователя посты автора."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def follow_feed(user):
+    """Посты авторов, на которых подписан пользователь."""
+    return Post.objects.filter(author__following__user=user)
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Лента подписок по курсору.
+
+    Страница авторов с полной лентой читается из TimelineEntry по
+    индексу (user, -created) с LIMIT, посты остальных авторов —
+    запросом с LIMIT на автора. Соединение с подписками нужно, только
+    когда курсор ушёл старше самой старой записи ленты.
+    """
+    def __init__(self, object_list, per_page, user, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user = user
+        self.posts = Post.objects.for_feed()
+
+    def rows(self, direction, key, limit):
+        follows = Follow.objects.filter(user=self.user)
+        on_read = list(follows.filter(
+            timeline_complete=False,
+        ).values_list('author', flat=True))
+        rows = self.complete_rows(
+            direction, key, limit,
+            follows.filter(timeline_complete=True).values('author'),
+        )
+        if len(on_read) > ON_READ_QUERIES:
+            rows += self.window_rows(
+                self.posts.filter(author__in=on_read), direction, key, limit,
+            )
+        else:
+            for author_id in on_read:
+                rows += self.window_rows(
+                    self.posts.filter(author_id=author_id),
+                    direction, key, limit,
+                )
+        rows = sorted(
+            {post.pk: post for post in rows}.values(),
+            key=lambda post: (post.created, post.pk),
+            reverse=direction == NEXT,
+        )
+        return rows[:limit]
+
+    def complete_rows(self, direction, key, limit, authors):
+        """Посты авторов с полной лентой: из ленты, а старше неё — по базе."""
+        if direction == NEXT:
+            rows = self.timeline_rows(direction, key, limit, authors)
+            if len(rows) < limit:
+                rows += self.history_rows(
+                    direction, key, limit, authors, self.oldest_entry(),
+                )
+            return rows
+        oldest = self.oldest_entry()
+        if oldest is not None and key >= oldest:
+            return self.timeline_rows(direction, key, limit, authors)
+        rows = self.history_rows(direction, key, limit, authors, oldest)
+        if oldest is not None and len(rows) < limit:
+            rows += self.timeline_rows(direction, key, limit, authors)
+        return rows
+
+    def oldest_entry(self):
+        return TimelineEntry.objects.filter(user=self.user).order_by(
+            'created', 'post_id',
+        ).values_list('created', 'post_id').first()
+
+    def timeline_rows(self, direction, key, limit, authors):
+        entries = TimelineEntry.objects.filter(
+            user=self.user, author__in=authors,
+        ).order_by('-created', '-post_id')
+        if key is not None:
+            entries = entries.filter(
+                self.key_filter(direction, key, pk_field='post_id'),
+            )
+        if direction != NEXT:
+            entries = entries.reverse()
+        return self.window_rows(
+            self.posts.filter(pk__in=entries.values('post')[:limit]),
+            direction, None, limit,
+        )
+
+    def history_rows(self, direction, key, limit, authors, oldest):
+        posts = self.posts.filter(author__in=authors)
+        if oldest is not None:
+            posts = posts.filter(self.key_filter(NEXT, oldest))
+        return self.window_rows(posts, direction, key, limit)
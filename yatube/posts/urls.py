@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -16,7 +16,27 @@ urlpatterns = [
         name='add_comment',
     ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export_data, name='export'),
+    path('api/posts/', api.feed_api, {'feed': 'index'}, name='api_index'),
+    path(
+        'api/group/<slug:slug>/',
+        api.feed_api,
+        {'feed': 'group'},
+        name='api_group',
+    ),
+    path(
+        'api/profile/<str:username>/',
+        api.feed_api,
+        {'feed': 'profile'},
+        name='api_profile',
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
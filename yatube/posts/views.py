@@ -1,40 +1,104 @@
+from functools import partial
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.cache import cache_page_versioned
+from core.metrics import instrument_view, registry
+from core.replicas import pin_primary
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .caching import FEED_GENERATION, INDEX_PAGE_TIMEOUT
+from .cards import attach_cards
+from .comments import comments_page
+from .conditional import (conditional, group_version, index_version,
+                          post_version, profile_version)
+from .counters import (FEED_ALL, FEED_GROUP, FeedCounter, FixedCount,
+                       FollowFeedCounter)
+from . import export
+from .forms import CommentForm, ExportForm, PostForm
+from .models import AuthorStats, Follow, Group, Post
+from .paginators import CountedPaginator, CursorPaginator
+from .search import search_posts
+from .thumbnails import schedule as schedule_thumbnails
+from .timeline import TimelinePaginator, follow_feed
 
 POSTS_PER_PAGE = 10
 
+page_depth = registry.histogram(
+    'yatube_paginator_page',
+    'Номер открытой страницы ленты; у курсора 1 — первая, 2 — дальше.',
+    labels=('paginator',),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 500, 1000),
+)
+
+
+def pagintor(posts, params, post_per_page=POSTS_PER_PAGE, counter=None,
+             cursor_paginator=CursorPaginator):
+    """
+    Страница ленты по параметрам запроса.
 
-def pagintor(posts, page, post_per_page=POSTS_PER_PAGE):
-    pagintor = Paginator(posts, post_per_page)
-    page_obj = pagintor.get_page(page)
+    По умолчанию лента листается курсором (`?cursor=`); нумерованные
+    страницы с OFFSET строятся, только если явно передан `?page=`.
+    Общее число постов берётся у `counter`, а не из COUNT(*).
+    `cursor_paginator` заменяет CursorPaginator, например для ленты
+    подписок.
+    Постам страницы подставляются карточки из кэша (`post.card`).
+    """
+    if 'page' in params:
+        pagintor = CountedPaginator(posts, post_per_page, counter=counter)
+        page_obj = pagintor.get_page(params.get('page'))
+        page_depth.observe(page_obj.number, paginator='page')
+    else:
+        pagintor = cursor_paginator(posts, post_per_page, counter=counter)
+        page_obj = pagintor.get_page(params.get('cursor'))
+        page_depth.observe(page_obj.number, paginator='cursor')
+    page_obj.object_list = attach_cards(page_obj.object_list)
     return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+@instrument_view
+@conditional(index_version)
+@cache_page_versioned(
+    INDEX_PAGE_TIMEOUT,
+    key_prefix='index_page',
+    generation=FEED_GENERATION,
+)
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.all().select_related()
-    page_obj = pagintor(posts, request.GET.get('page'))
+    posts = Post.objects.for_feed()
+    page_obj = pagintor(
+        posts,
+        request.GET,
+        counter=FeedCounter(FEED_ALL, approximate=True),
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@instrument_view
+@conditional(group_version)
 def group_posts(request, slug):
     """
     Сообщества
     """
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    page_obj = pagintor(posts, request.GET.get('page'))
+    posts = Post.objects.filter(group=group).for_feed()
+    page_obj = pagintor(
+        posts,
+        request.GET,
+        counter=FeedCounter(FEED_GROUP, group.pk),
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -42,12 +106,19 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@instrument_view
+@conditional(profile_version)
 def profile(request, username):
     template = 'posts/profile.html'
     User = get_user_model()
     author = User.objects.get(username=username)
-    posts = author.posts.all()
-    page_obj = pagintor(posts, request.GET.get('page'))
+    stats = AuthorStats.objects.for_author(author)
+    posts = author.posts.for_feed()
+    page_obj = pagintor(
+        posts,
+        request.GET,
+        counter=FixedCount(stats.posts_count),
+    )
     if request.user.is_authenticated:
         following = author.following.filter(user=request.user)
     else:
@@ -56,26 +127,81 @@ def profile(request, username):
     context = {
         'page_obj': page_obj,
         'author': author,
+        'stats': stats,
         'following': following,
     }
     return render(request, template, context)
 
 
+@instrument_view
+@conditional(post_version)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    posts_count = AuthorStats.objects.for_author(post.author).posts_count
     form = CommentForm()
-    comments = post.comments.all()
+    comments, next_cursor = comments_page(post.pk)
     context = {
         'post': post,
         'posts_count': posts_count,
         'form': form,
         'comments': comments,
+        'next_comments': next_comments_url(post.pk, next_cursor),
     }
     return render(request, template, context)
 
 
+def next_comments_url(post_id, cursor):
+    if cursor is None:
+        return None
+    return '%s?%s' % (
+        reverse('posts:post_comments', args=(post_id,)),
+        urlencode({'cursor': cursor}),
+    )
+
+
+@instrument_view
+def post_comments(request, post_id):
+    """
+    Следующая страница комментариев для кнопки «Показать ещё».
+
+    Отдаёт фрагмент HTML, а с `Accept: application/json` — JSON с
+    фрагментом и адресом следующей страницы.
+    """
+    comments, next_cursor = comments_page(post_id, request.GET.get('cursor'))
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    next_url = next_comments_url(post_id, next_cursor)
+    html = render_to_string(
+        'posts/includes/comment_list.html',
+        {'comments': comments, 'next_comments': next_url},
+        request,
+    )
+    if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+        return JsonResponse({'html': html, 'next': next_url})
+    return HttpResponse(html)
+
+
+@instrument_view
+def search(request):
+    """Поиск по текстам постов, самые релевантные — первыми."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(query).for_feed()
+    # Ранжированную выдачу листаем по номерам страниц.
+    params = request.GET.copy()
+    params.setdefault('page', 1)
+    page_obj = pagintor(posts, params)
+    context = {
+        'query': query,
+        'query_prefix': urlencode({'q': query}) + '&',
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@instrument_view
+@pin_primary
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -87,6 +213,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post)
         return redirect('posts:profile', request.user.username)
     groups = Group.objects.all()
     context = {
@@ -96,6 +223,8 @@ def post_create(request):
     return render(request, template, context)
 
 
+@instrument_view
+@pin_primary
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
@@ -108,7 +237,10 @@ def post_edit(request, post_id):
         instance=post,
     )
     if form.is_valid():
-        form.save(commit=False).save()
+        post = form.save()
+        # Новая миниатюра нужна, только если сменилась картинка.
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post.id)
     groups = Group.objects.all()
     context = {
@@ -120,6 +252,8 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+@instrument_view
+@pin_primary
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -132,32 +266,62 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@instrument_view
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagintor(posts, request.GET.get('page'))
+    posts = follow_feed(request.user).for_feed()
+    page_obj = pagintor(
+        posts,
+        request.GET,
+        counter=FollowFeedCounter(request.user.pk),
+        cursor_paginator=partial(TimelinePaginator, user=request.user),
+    )
     context = {'page_obj': page_obj, }
     return render(request, 'posts/index.html', context)
 
 
+@instrument_view
+@pin_primary
 @login_required
 def profile_follow(request, username):
     User = get_user_model()
     author = get_object_or_404(User, username=username)
-    if (
-            (author != request.user)
-            and not author.following.filter(user=request.user).exists()
-    ):
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+    if author != request.user:
+        try:
+            with transaction.atomic():
+                Follow.objects.create(
+                    user=request.user,
+                    author=author,
+                )
+        except IntegrityError:
+            # Уже подписан: повтор отсекает ограничение unique_follow.
+            pass
     return redirect('posts:profile', username)
 
 
+@instrument_view
+@pin_primary
 @login_required
 def profile_unfollow(request, username):
     User = get_user_model()
     author = get_object_or_404(User, username=username)
     author.following.get(user=request.user).delete()
     return redirect('posts:profile', username)
+
+
+@instrument_view
+@staff_member_required
+def export_data(request):
+    """Потоковая выгрузка постов, комментариев или подписок."""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    kind, options = form.export_options()
+    response = StreamingHttpResponse(
+        export.export(kind, **options),
+        content_type=export.content_type(options['format'], options['gzip']),
+    )
+    response['Content-Disposition'] = 'attachment; filename="%s"' % (
+        export.file_name(kind, options['format'], options['gzip'])
+    )
+    return response
@@ -1,16 +1,23 @@
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = 'kdwe=5pytrc4(lgqq&v*%)n6@szd^0cx3g0ut#yb4=bczias2n'
 
-DEBUG = True
+# В продакшене: DJANGO_DEBUG=0 и адреса сайта в DJANGO_ALLOWED_HOSTS
+# через запятую.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') != '0'
 
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
     '[::1]',
     'testserver',
+] + [
+    host.strip()
+    for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host.strip()
 ]
 
 INSTALLED_APPS = [
@@ -28,11 +35,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -41,12 +51,25 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+# Кэширующий загрузчик: шаблон разбирается один раз на процесс. При
+# разработке выключен, чтобы правки шаблонов видны были без перезапуска.
+TEMPLATE_CACHE = not DEBUG
+# Разобрать шаблоны при старте воркера (core.warmup, yatube/wsgi.py).
+WARM_TEMPLATES = TEMPLATE_CACHE
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader',
+                         TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -64,8 +87,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 60,
+    },
+    # Локальная реплика: копия основной базы, которую обновляет
+    # `python manage.py sync_replica`.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+    },
+}
+# PRAGMA для каждого нового соединения SQLite (core.sqlite).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — в КиБ: 64 МиБ на соединение.
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
 }
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Базы, с которых читают GET-запросы (core.replicas); пусто — всё с
+# основной. Для проверки локально: ['replica'].
+DATABASE_REPLICAS = []
+# Сколько секунд после записи пользователь читает с основной базы.
+PRIMARY_PIN_SECONDS = 10
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -97,14 +143,67 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Потоки, которые готовят миниатюры после сохранения поста; 0 — в
+# самом запросе после фиксации транзакции.
+THUMBNAIL_WORKERS = 2
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Профилирование запросов (core.profiling): доля профилируемых
+# запросов, 0 — выключено. PROFILING_LOG — путь к JSONL-логу.
+PROFILING_SAMPLE_RATE = 0
+PROFILING_LOG = None
+PROFILING_LOG_MAX_BYTES = 10 * 1024 * 1024
+PROFILING_LOG_BACKUP_COUNT = 5
+
+# Сжатие ответов gzip и удаление отступов из HTML (core.compression).
+# Ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются: выигрыш меньше
+# накладных расходов. Уровень 5 почти не уступает 9 в размере HTML, но
+# заметно быстрее.
+COMPRESSION_ENABLED = False
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVEL = 5
+HTML_STRIP_WHITESPACE = False
+
+# Куда процессы складывают свои метрики для /metrics (core.metrics).
+METRICS_DIR = os.path.join(BASE_DIR, '.metrics')
+# С каких адресов /metrics отдаётся без входа (сборщик метрик);
+# остальным — только сотрудникам.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Локальный LRU каждого воркера перед общим кэшем. В продакшене
+# 'shared' — Redis/Memcached; локально хватает SQLite.
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache_backends.TieredCache',
+        'OPTIONS': {
+            'SHARED_CACHE': 'shared',
+            'LOCAL_TIMEOUT': 2,
+            'LOCAL_MAX_ENTRIES': 500,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache', 'shared.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+# Тесты очищают кэш: общий кэш тестов живёт в памяти процесса, чтобы
+# прогон не стирал кэш запущенного локально сервера. Миниатюры режутся
+# без пула: поток пула писал в базу, пока тест её очищал.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    THUMBNAIL_WORKERS = 0
+    CACHES['shared'] = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube-tests',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
-}